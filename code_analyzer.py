@@ -376,19 +376,15 @@ async def search_functions(
     # Get files to search
     if search_path.is_file():
         files_to_search = [search_path]
+    elif recursive and max_depth is not None:
+        # The scandir walk only yields regular files, typed from the directory listing
+        files_to_search = list(walk_with_depth(search_path, file_pattern, max_depth))
     else:
-        if recursive:
-            if max_depth is not None:
-                files_to_search = list(walk_with_depth(search_path, file_pattern, max_depth))
-            else:
-                files_to_search = list(search_path.rglob(file_pattern))
-        else:
-            files_to_search = list(search_path.glob(file_pattern))
+        # glob/rglob also match directories, so keep only the files
+        matches = search_path.rglob(file_pattern) if recursive else search_path.glob(file_pattern)
+        files_to_search = [file_path for file_path in matches if file_path.is_file()]
     
     for file_path in files_to_search:
-        if not file_path.is_file():
-            continue
-        
         try:
             # Get language from file extension
             suffix = file_path.suffix.lower()
@@ -2,16 +2,103 @@
 File operations abstraction layer for local and SSH operations.
 """
 
+from __future__ import annotations
+
 import os
+import re
+import codecs
+import functools
 import stat
 import shutil
 import asyncio
+import itertools
+import posixpath
+import secrets
+import time
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union, AsyncIterator, Tuple
-import asyncssh
+from typing import List, Dict, Any, Optional, Union, AsyncIterator, Tuple, Callable, Awaitable
 from datetime import datetime
 
+from ssh_manager import lazy_import
+
+asyncssh = lazy_import('asyncssh')
+
+
+# Bytes other than b'\n' that str.splitlines() treats as line boundaries in ASCII text
+_OTHER_LINE_BREAKS = re.compile(rb'[\r\v\f\x1c-\x1e]')
+
+
+def _counts_by_newline(chunk: bytes) -> bool:
+    """True if chunk is ASCII text whose only line boundary is b'\n'."""
+    return chunk.isascii() and _OTHER_LINE_BREAKS.search(chunk) is None
+
+
+def count_file_lines(path: Path, chunk_size: int = 1 << 20) -> int:
+    """Count lines in a local file the way len(text.splitlines()) does.
+    
+    Plain ASCII is counted by scanning raw bytes for newlines. From the first
+    chunk holding anything else, the rest of the file is decoded as UTF-8 and
+    split instead, so other line boundaries are honoured and undecodable files
+    raise UnicodeDecodeError.
+    """
+    count = 0
+    last_chunk = b''
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            if not _counts_by_newline(chunk):
+                # Everything before this chunk is ASCII, so it is a clean place to start decoding
+                return count + len((chunk + f.read()).decode('utf-8').splitlines())
+            count += chunk.count(b'\n')
+            last_chunk = chunk
+    if last_chunk and not last_chunk.endswith(b'\n'):
+        count += 1
+    return count
+
+
+def read_text_file(path: Path, encoding: str = 'utf-8') -> str:
+    """Read a local text file with raw os.read calls and decode it in one step.
+    
+    Skips the buffered/TextIOWrapper layers of Path.read_text(), which dominate
+    the cost for small files, while keeping its universal-newline translation.
+    """
+    fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        # Ask for one byte more than the size so a single read normally reaches EOF
+        size = os.fstat(fd).st_size
+        chunks = []
+        while True:
+            chunk = os.read(fd, max(size + 1, 1 << 16))
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+    return decode_text(b''.join(chunks), encoding)
+
+
+def decode_text(data: bytes, encoding: str = 'utf-8') -> str:
+    """Decode bytes with universal-newline translation, as text-mode reads do."""
+    text = data.decode(encoding)
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def _split_at_last_line(data: bytes) -> Tuple[bytes, bytes]:
+    """Split data into its complete lines and the trailing partial line."""
+    cut = data.rfind(b'\n') + 1
+    return data[:cut], data[cut:]
+
+
+@functools.lru_cache(maxsize=None)
+def _newline_is_byte(encoding: str) -> bool:
+    """True if encoding writes '\n' as the single byte b'\n', as ASCII-compatible ones do."""
+    return '\n'.encode(encoding) == b'\n'
+
 
 class FileOperationsInterface(ABC):
     """Abstract interface for file operations."""
@@ -36,11 +123,26 @@ class FileOperationsInterface(ABC):
         """Get file statistics."""
         pass
     
+    @abstractmethod
+    async def stat_many(self, paths: List[Path]) -> List[Optional[os.stat_result]]:
+        """Get statistics for several paths at once (None for paths that fail)."""
+        pass
+    
     @abstractmethod
     async def listdir(self, path: Path) -> List[str]:
         """List directory contents."""
         pass
     
+    @abstractmethod
+    async def listdir_stat(self, path: Path) -> List[Tuple[str, Optional[os.stat_result]]]:
+        """List directory entries together with their stat results (None if unavailable)."""
+        pass
+    
+    @abstractmethod
+    async def scandir(self, path: Path) -> List[Tuple[str, bool, bool]]:
+        """List directory entries as (name, is_dir, is_file) tuples, following symlinks."""
+        pass
+    
     @abstractmethod
     async def glob(self, path: Path, pattern: str) -> AsyncIterator[Path]:
         """Glob pattern matching."""
@@ -56,11 +158,31 @@ class FileOperationsInterface(ABC):
         """Read binary file contents."""
         pass
     
+    @abstractmethod
+    async def read_lines(self, path: Path, start: int = 0, stop: Optional[int] = None, encoding: str = 'utf-8') -> str:
+        """Read lines [start:stop) of a file without reading past the last one requested."""
+        pass
+    
+    @abstractmethod
+    def iter_line_chunks(self, path: Path, chunk_size: int = 1 << 20, encoding: str = 'utf-8') -> AsyncIterator[str]:
+        """Yield a text file in pieces of whole lines, reading about chunk_size bytes at a time."""
+        pass
+    
+    @abstractmethod
+    async def count_lines(self, path: Path) -> int:
+        """Count the lines in a file as len(text.splitlines()) would, decoding only when needed."""
+        pass
+    
     @abstractmethod
     async def write_file(self, path: Path, content: Union[str, bytes], encoding: str = 'utf-8') -> None:
         """Write file contents."""
         pass
     
+    @abstractmethod
+    async def write_file_atomic(self, path: Path, content: Union[str, bytes], encoding: str = 'utf-8') -> None:
+        """Replace a file's contents via a temporary file and a rename, so readers never see a partial write."""
+        pass
+    
     @abstractmethod
     async def makedirs(self, path: Path, exist_ok: bool = True) -> None:
         """Create directories recursively."""
@@ -95,6 +217,10 @@ class FileOperationsInterface(ABC):
     async def search_files(self, path: Path, pattern: str, max_depth: Optional[int] = None) -> List[Tuple[Path, List[str]]]:
         """Search for pattern in files."""
         pass
+    
+    def forget_cached_stats(self) -> None:
+        """Drop any cached file metadata after the filesystem was changed by other means, e.g. a shell command."""
+        pass
 
 
 class LocalFileOperations(FileOperationsInterface):
@@ -112,25 +238,103 @@ class LocalFileOperations(FileOperationsInterface):
     async def stat(self, path: Path) -> os.stat_result:
         return path.stat()
     
+    async def stat_many(self, paths: List[Path]) -> List[Optional[os.stat_result]]:
+        # One worker thread hop for the whole batch instead of one per path
+        return await asyncio.to_thread(self._stat_many_sync, paths)
+    
+    @staticmethod
+    def _stat_many_sync(paths: List[Path]) -> List[Optional[os.stat_result]]:
+        results = []
+        for path in paths:
+            try:
+                results.append(os.stat(path))
+            except OSError:
+                results.append(None)
+        return results
+    
     async def listdir(self, path: Path) -> List[str]:
         return list(os.listdir(path))
     
+    async def listdir_stat(self, path: Path) -> List[Tuple[str, Optional[os.stat_result]]]:
+        results = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    results.append((entry.name, entry.stat()))
+                except OSError:
+                    results.append((entry.name, None))
+        return results
+    
+    async def scandir(self, path: Path) -> List[Tuple[str, bool, bool]]:
+        # DirEntry types come from the directory read itself; only symlinks need a stat
+        with os.scandir(path) as entries:
+            return [(entry.name, entry.is_dir(), entry.is_file()) for entry in entries]
+    
     async def glob(self, path: Path, pattern: str) -> AsyncIterator[Path]:
         for item in path.glob(pattern):
             yield item
     
     async def read_file(self, path: Path, encoding: str = 'utf-8') -> str:
-        return path.read_text(encoding=encoding)
+        return read_text_file(path, encoding)
     
     async def read_binary(self, path: Path) -> bytes:
         return path.read_bytes()
     
+    async def read_lines(self, path: Path, start: int = 0, stop: Optional[int] = None, encoding: str = 'utf-8') -> str:
+        with open(path, 'r', encoding=encoding) as f:
+            # Split further on the other boundaries str.splitlines() honours, e.g. form feeds
+            lines = itertools.chain.from_iterable(line.splitlines(keepends=True) for line in f)
+            return ''.join(itertools.islice(lines, start, stop))
+    
+    async def iter_line_chunks(self, path: Path, chunk_size: int = 1 << 20, encoding: str = 'utf-8') -> AsyncIterator[str]:
+        fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            carry = b''
+            while True:
+                chunk = os.read(fd, chunk_size)
+                if not chunk:
+                    break
+                lines, carry = _split_at_last_line(carry + chunk)
+                if lines:
+                    yield decode_text(lines, encoding)
+            if carry:
+                yield decode_text(carry, encoding)
+        finally:
+            os.close(fd)
+    
+    async def count_lines(self, path: Path) -> int:
+        return count_file_lines(path)
+    
     async def write_file(self, path: Path, content: Union[str, bytes], encoding: str = 'utf-8') -> None:
         if isinstance(content, str):
             path.write_text(content, encoding=encoding)
         else:
             path.write_bytes(content)
     
+    async def write_file_atomic(self, path: Path, content: Union[str, bytes], encoding: str = 'utf-8') -> None:
+        # Write through symlinks to the file they point at, keeping its permissions
+        target = os.path.realpath(path)
+        tmp = os.path.join(os.path.dirname(target), f'.{os.path.basename(target)}.{secrets.token_hex(4)}.tmp')
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+        try:
+            if isinstance(content, str):
+                with open(fd, 'w', encoding=encoding) as f:
+                    f.write(content)
+            else:
+                with open(fd, 'wb') as f:
+                    f.write(content)
+            try:
+                shutil.copymode(target, tmp)
+            except OSError:
+                pass  # No existing file to take the mode from
+            os.replace(tmp, target)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+    
     async def makedirs(self, path: Path, exist_ok: bool = True) -> None:
         path.mkdir(parents=True, exist_ok=exist_ok)
     
@@ -188,10 +392,62 @@ class LocalFileOperations(FileOperationsInterface):
 class SSHFileOperations(FileOperationsInterface):
     """SSH-based filesystem operations implementation."""
     
-    def __init__(self, conn: asyncssh.SSHClientConnection, sftp: asyncssh.SFTPClient):
+    # Remote stat results are reused this long (seconds), since one tool call often
+    # checks the same path several times (exists, then is_dir, then stat)
+    STAT_CACHE_TTL = 2.0
+    STAT_CACHE_SIZE = 1024
+    # Paths found missing are remembered for a shorter time, so repeated probes of
+    # candidate paths do not each cost a round trip
+    MISSING_CACHE_TTL = 0.5
+    MISSING_CACHE_SIZE = 512
+    # Bytes per SFTP request in bulk transfers; by default the server's negotiated
+    # maximum (-1), which asyncssh keeps up to 4 MiB of in flight per read or write
+    TRANSFER_BLOCK_SIZE = int(os.environ.get('SSH_BLOCK_SIZE', '-1'))
+    
+    def __init__(self, conn: asyncssh.SSHClientConnection, sftp: asyncssh.SFTPClient,
+                 transfer_channels: Optional[Callable[[], Awaitable[List[asyncssh.SFTPClient]]]] = None):
         self.conn = conn
         self.sftp = sftp
         self._host = conn.get_extra_info('peername')[0]
+        # Optional source of extra SFTP channels that bulk transfers are striped over
+        self._transfer_channels = transfer_channels
+        self._transfer_count = itertools.count()
+        self._stat_cache: Dict[str, Tuple[float, asyncssh.SFTPAttrs]] = {}
+        self._missing: Dict[str, Tuple[float, str]] = {}
+    
+    async def _stat_attrs(self, remote_path: str) -> asyncssh.SFTPAttrs:
+        """sftp.stat() through a short-lived cache of hits and misses."""
+        now = time.monotonic()
+        cached = self._stat_cache.get(remote_path)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        missing = self._missing.get(remote_path)
+        if missing is not None and missing[0] > now:
+            raise asyncssh.SFTPNoSuchFile(missing[1])
+        
+        try:
+            attrs = await self.sftp.stat(remote_path)
+        except asyncssh.SFTPNoSuchFile as e:
+            if len(self._missing) >= self.MISSING_CACHE_SIZE:
+                del self._missing[next(iter(self._missing))]
+            self._missing[remote_path] = (now + self.MISSING_CACHE_TTL, e.reason)
+            raise
+        if len(self._stat_cache) >= self.STAT_CACHE_SIZE:
+            del self._stat_cache[next(iter(self._stat_cache))]  # Drop the oldest entry
+        self._stat_cache[remote_path] = (now + self.STAT_CACHE_TTL, attrs)
+        return attrs
+    
+    def forget_cached_stats(self) -> None:
+        """Drop cached stats after a change to the remote filesystem."""
+        self._stat_cache.clear()
+        self._missing.clear()
+    
+    async def _transfer_sftp(self) -> asyncssh.SFTPClient:
+        """Pick the SFTP client for the next bulk transfer, round-robin over the channels."""
+        if self._transfer_channels is None:
+            return self.sftp
+        channels = await self._transfer_channels()
+        return channels[next(self._transfer_count) % len(channels)]
     
     def _to_remote_path(self, path: Path) -> str:
         """Convert Path object to remote path string."""
@@ -200,27 +456,27 @@ class SSHFileOperations(FileOperationsInterface):
     
     async def exists(self, path: Path) -> bool:
         try:
-            await self.sftp.stat(self._to_remote_path(path))
+            await self._stat_attrs(self._to_remote_path(path))
             return True
         except asyncssh.SFTPNoSuchFile:
             return False
     
     async def is_file(self, path: Path) -> bool:
         try:
-            attrs = await self.sftp.stat(self._to_remote_path(path))
+            attrs = await self._stat_attrs(self._to_remote_path(path))
             return attrs.type == asyncssh.FILEXFER_TYPE_REGULAR
         except asyncssh.SFTPNoSuchFile:
             return False
     
     async def is_dir(self, path: Path) -> bool:
         try:
-            attrs = await self.sftp.stat(self._to_remote_path(path))
+            attrs = await self._stat_attrs(self._to_remote_path(path))
             return attrs.type == asyncssh.FILEXFER_TYPE_DIRECTORY
         except asyncssh.SFTPNoSuchFile:
             return False
     
-    async def stat(self, path: Path) -> os.stat_result:
-        attrs = await self.sftp.stat(self._to_remote_path(path))
+    @staticmethod
+    def _attrs_to_stat(attrs: asyncssh.SFTPAttrs) -> os.stat_result:
         # Create a stat_result-like object
         # Note: This is a simplified version - some fields may not be accurate
         return os.stat_result((
@@ -236,10 +492,55 @@ class SSHFileOperations(FileOperationsInterface):
             attrs.mtime or 0,  # st_ctime
         ))
     
+    async def stat(self, path: Path) -> os.stat_result:
+        attrs = await self._stat_attrs(self._to_remote_path(path))
+        return self._attrs_to_stat(attrs)
+    
+    async def stat_many(self, paths: List[Path], batch_size: int = 64) -> List[Optional[os.stat_result]]:
+        # Keep a batch of SFTP STAT requests in flight instead of one round-trip each
+        results = []
+        for i in range(0, len(paths), batch_size):
+            batch = await asyncio.gather(
+                *(self.stat(path) for path in paths[i:i + batch_size]),
+                return_exceptions=True
+            )
+            results.extend(None if isinstance(r, Exception) else r for r in batch)
+        return results
+    
     async def listdir(self, path: Path) -> List[str]:
         remote_path = self._to_remote_path(path)
         entries = await self.sftp.listdir(remote_path)
-        return [entry.filename for entry in entries]
+        return [name for name in entries if name not in ('.', '..')]
+    
+    async def listdir_stat(self, path: Path) -> List[Tuple[str, Optional[os.stat_result]]]:
+        # READDIR already carries each entry's attributes, so no per-entry STAT round-trip
+        remote_path = self._to_remote_path(path)
+        results = []
+        for entry in await self.sftp.readdir(remote_path):
+            if entry.filename in ('.', '..'):
+                continue
+            # READDIR reports links themselves; leave those for a following stat
+            if entry.attrs.type == asyncssh.FILEXFER_TYPE_SYMLINK:
+                results.append((entry.filename, None))
+            else:
+                results.append((entry.filename, self._attrs_to_stat(entry.attrs)))
+        return results
+    
+    async def scandir(self, path: Path) -> List[Tuple[str, bool, bool]]:
+        entries = await self.listdir_stat(path)
+        # Only symlinks lack attributes from READDIR; resolve those together
+        links = [name for name, stat_info in entries if stat_info is None]
+        link_stats = dict(zip(links, await self.stat_many([path / name for name in links])))
+        
+        results = []
+        for name, stat_info in entries:
+            if stat_info is None:
+                stat_info = link_stats[name]
+            if stat_info is None:
+                results.append((name, False, False))
+            else:
+                results.append((name, stat.S_ISDIR(stat_info.st_mode), stat.S_ISREG(stat_info.st_mode)))
+        return results
     
     async def glob(self, path: Path, pattern: str) -> AsyncIterator[Path]:
         # Simple glob implementation for SSH
@@ -256,7 +557,8 @@ class SSHFileOperations(FileOperationsInterface):
     
     async def read_file(self, path: Path, encoding: str = 'utf-8') -> str:
         remote_path = self._to_remote_path(path)
-        async with self.sftp.open(remote_path, 'r') as f:
+        async with self.sftp.open(remote_path, 'rb') as f:
+            # A whole-file read is issued as pipelined block requests (max_requests in flight)
             content = await f.read()
         return content.decode(encoding)
     
@@ -265,6 +567,65 @@ class SSHFileOperations(FileOperationsInterface):
         async with self.sftp.open(remote_path, 'rb') as f:
             return await f.read()
     
+    async def read_lines(self, path: Path, start: int = 0, stop: Optional[int] = None, encoding: str = 'utf-8') -> str:
+        if stop is None or not _newline_is_byte(encoding):
+            # Nothing to stop early for, or newlines can't be counted undecoded (e.g. UTF-16)
+            content = await self.read_file(path, encoding)
+            return ''.join(content.splitlines(keepends=True)[start:stop])
+        
+        # Stop fetching blocks once the last requested line has arrived
+        remote_path = self._to_remote_path(path)
+        data = bytearray()
+        newlines = 0
+        at_eof = False
+        async with self.sftp.open(remote_path, 'rb') as f:
+            while newlines < stop:
+                chunk = await f.read(32768)
+                if not chunk:
+                    at_eof = True
+                    break
+                data += chunk
+                newlines += chunk.count(b'\n')
+        # Every b'\n' ends a line, so the requested ones are complete; only a cut
+        # character after the last of them may be left undecoded
+        text = codecs.getincrementaldecoder(encoding)().decode(bytes(data), final=at_eof)
+        return ''.join(text.splitlines(keepends=True)[start:stop])
+    
+    async def iter_line_chunks(self, path: Path, chunk_size: int = 1 << 20, encoding: str = 'utf-8') -> AsyncIterator[str]:
+        remote_path = self._to_remote_path(path)
+        carry = b''
+        async with self.sftp.open(remote_path, 'rb') as f:
+            while True:
+                chunk = await f.read(chunk_size)
+                if not chunk:
+                    break
+                lines, carry = _split_at_last_line(carry + chunk)
+                if lines:
+                    yield decode_text(lines, encoding)
+                if len(chunk) < chunk_size:
+                    break  # Large reads only come back short at end of file; skip the extra round-trip
+        if carry:
+            yield decode_text(carry, encoding)
+    
+    async def count_lines(self, path: Path) -> int:
+        # Stream the file in SFTP-sized blocks rather than pulling it whole
+        remote_path = self._to_remote_path(path)
+        count = 0
+        last_chunk = b''
+        async with self.sftp.open(remote_path, 'rb') as f:
+            while True:
+                chunk = await f.read(32768)
+                if not chunk:
+                    break
+                if not _counts_by_newline(chunk):
+                    # Same fallback as count_file_lines: decode and split the rest
+                    return count + len((chunk + await f.read()).decode('utf-8').splitlines())
+                count += chunk.count(b'\n')
+                last_chunk = chunk
+        if last_chunk and not last_chunk.endswith(b'\n'):
+            count += 1
+        return count
+    
     async def write_file(self, path: Path, content: Union[str, bytes], encoding: str = 'utf-8') -> None:
         remote_path = self._to_remote_path(path)
         if isinstance(content, str):
@@ -272,6 +633,90 @@ class SSHFileOperations(FileOperationsInterface):
         
         async with self.sftp.open(remote_path, 'wb') as f:
             await f.write(content)
+        self.forget_cached_stats()
+    
+    async def upload_file(self, local_path: Path, path: Path, chunk_size: int = 4 << 20) -> int:
+        """Stream a local file to the remote path in chunk_size pieces; returns the bytes sent."""
+        remote_path = self._to_remote_path(path)
+        size = 0
+        sftp = await self._transfer_sftp()
+        with open(local_path, 'rb') as src:
+            async with sftp.open(remote_path, 'wb', block_size=self.TRANSFER_BLOCK_SIZE) as f:
+                # The next piece is read from disk in a thread while the current one is sent
+                next_read = asyncio.ensure_future(asyncio.to_thread(src.read, chunk_size))
+                try:
+                    while True:
+                        chunk = await next_read
+                        if not chunk:
+                            break
+                        next_read = asyncio.ensure_future(asyncio.to_thread(src.read, chunk_size))
+                        # Large writes are split into pipelined SFTP requests
+                        await f.write(chunk)
+                        size += len(chunk)
+                finally:
+                    # Never close the file under a read still running in its thread
+                    await asyncio.gather(next_read, return_exceptions=True)
+        self.forget_cached_stats()
+        return size
+    
+    async def download_file(self, path: Path, local_path: Path, chunk_size: int = 4 << 20) -> int:
+        """Stream the remote path to a local file in chunk_size pieces; returns the bytes received."""
+        remote_path = self._to_remote_path(path)
+        size = 0
+        sftp = await self._transfer_sftp()
+        async with sftp.open(remote_path, 'rb', block_size=self.TRANSFER_BLOCK_SIZE) as f:
+            with open(local_path, 'wb') as dst:
+                # Each piece is written to disk in a thread while the next one is fetched
+                pending_write = None
+                try:
+                    while True:
+                        # Large reads are split into pipelined SFTP requests
+                        chunk = await f.read(chunk_size)
+                        if pending_write is not None:
+                            await pending_write
+                            pending_write = None
+                        if chunk:
+                            pending_write = asyncio.ensure_future(asyncio.to_thread(dst.write, chunk))
+                            size += len(chunk)
+                        if len(chunk) < chunk_size:
+                            break  # Large reads only come back short at end of file
+                    if pending_write is not None:
+                        await pending_write
+                        pending_write = None
+                finally:
+                    if pending_write is not None:
+                        await asyncio.gather(pending_write, return_exceptions=True)
+        return size
+    
+    async def write_file_atomic(self, path: Path, content: Union[str, bytes], encoding: str = 'utf-8') -> None:
+        if isinstance(content, str):
+            content = content.encode(encoding)
+        
+        # Write through symlinks to the file they point at, keeping its permissions
+        target = await self.sftp.realpath(self._to_remote_path(path))
+        tmp = posixpath.join(posixpath.dirname(target), f'.{posixpath.basename(target)}.{secrets.token_hex(4)}.tmp')
+        try:
+            async with self.sftp.open(tmp, 'wb') as f:
+                await f.write(content)
+            try:
+                attrs = await self.sftp.stat(target)
+                await self.sftp.chmod(tmp, stat.S_IMODE(attrs.permissions))
+            except asyncssh.SFTPError:
+                pass  # No existing file to take the mode from
+            try:
+                await self.sftp.posix_rename(tmp, target)
+            except asyncssh.SFTPOpUnsupported:
+                # Plain SFTP rename refuses to overwrite, so fall back to writing in place
+                await self.sftp.remove(tmp)
+                await self.write_file(path, content)
+        except BaseException:
+            try:
+                await self.sftp.remove(tmp)
+            except asyncssh.SFTPError:
+                pass
+            raise
+        finally:
+            self.forget_cached_stats()
     
     async def makedirs(self, path: Path, exist_ok: bool = True) -> None:
         remote_path = self._to_remote_path(path)
@@ -279,33 +724,46 @@ class SSHFileOperations(FileOperationsInterface):
         # Check if exists
         if exist_ok:
             try:
-                attrs = await self.sftp.stat(remote_path)
+                attrs = await self._stat_attrs(remote_path)
                 if attrs.type == asyncssh.FILEXFER_TYPE_DIRECTORY:
                     return
             except asyncssh.SFTPNoSuchFile:
                 pass
         
-        # Create parent directories if needed
-        parts = remote_path.split('/')
-        current = ''
-        for part in parts:
-            if not part:
-                continue
-            current = current + '/' + part if current else part
+        try:
+            await self._mkdir_parents(posixpath.normpath(remote_path))
+        finally:
+            self.forget_cached_stats()
+    
+    async def _mkdir_parents(self, remote_path: str) -> None:
+        """mkdir, creating missing parents only when the first attempt says they are missing."""
+        try:
+            await self.sftp.mkdir(remote_path)
+        except asyncssh.SFTPNoSuchFile:
+            parent = posixpath.dirname(remote_path)
+            if not parent or parent == remote_path:
+                raise
+            await self._mkdir_parents(parent)
             try:
-                await self.sftp.mkdir(current)
-            except asyncssh.SFTPFailure:
-                # Directory might already exist
+                await self.sftp.mkdir(remote_path)
+            except (asyncssh.SFTPFailure, asyncssh.SFTPFileAlreadyExists):
                 pass
+        except (asyncssh.SFTPFailure, asyncssh.SFTPFileAlreadyExists):
+            # Directory might already exist
+            pass
     
     async def remove(self, path: Path) -> None:
         remote_path = self._to_remote_path(path)
         await self.sftp.remove(remote_path)
+        self.forget_cached_stats()
     
     async def rmtree(self, path: Path) -> None:
         remote_path = self._to_remote_path(path)
         # Recursively remove directory
-        await self._rmtree_recursive(remote_path)
+        try:
+            await self._rmtree_recursive(remote_path)
+        finally:
+            self.forget_cached_stats()
     
     async def _rmtree_recursive(self, remote_path: str) -> None:
         """Recursively remove directory tree."""
@@ -325,6 +783,7 @@ class SSHFileOperations(FileOperationsInterface):
         src_remote = self._to_remote_path(src)
         dst_remote = self._to_remote_path(dst)
         await self.sftp.rename(src_remote, dst_remote)
+        self.forget_cached_stats()
     
     async def copy_file(self, src: Path, dst: Path) -> None:
         # Read and write to copy
@@ -337,6 +796,7 @@ class SSHFileOperations(FileOperationsInterface):
             await self.sftp.chmod(self._to_remote_path(dst), attrs.permissions)
         except:
             pass
+        self.forget_cached_stats()
     
     async def copy_tree(self, src: Path, dst: Path) -> None:
         """Copy directory tree recursively."""
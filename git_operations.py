@@ -4,14 +4,27 @@ Provides git functionality for both local and remote (SSH) repositories.
 """
 
 import asyncio
+import itertools
 import os
 import re
+import time
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple, Union
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 from file_operations import FileOperationsInterface, LocalFileOperations, SSHFileOperations
 
+try:
+    import pygit2
+    from pygit2.enums import ReferenceType, SortMode
+except ImportError:  # Optional; without it every local query runs the git CLI
+    pygit2 = None
+
+# Output parsers, compiled once instead of on every call
+_LOG_LIMIT_RE = re.compile(r'-\d+')
+_STATUS_BRANCH_RE = re.compile(r'## (.+?)(?:\.{3}(.+?))?(?:\s+\[(.+?)\])?$')
+_COMMIT_HASH_RE = re.compile(r'\[.*\s+([a-f0-9]+)\]')
+
 
 class GitOperationsInterface:
     """Interface for git operations that can work on both local and remote systems."""
@@ -60,6 +73,148 @@ class LocalGitOperations(GitOperationsInterface):
         return returncode == 0
 
 
+class Pygit2GitOperations(LocalGitOperations):
+    """Local git operations that answer common read-only queries in-process via libgit2.
+    
+    rev-parse --git-dir, branch listings, remote -v and the detailed log are
+    emulated with pygit2 to save a git process per call. Everything else,
+    including log --oneline (git picks the abbreviated hash length from the
+    object count), and any repository state or config the emulation does not
+    cover, runs the git CLI as before.
+    """
+    
+    # Config that changes what the git CLI prints for the emulated queries
+    _CLI_ONLY_CONFIG = ('log.decorate', 'log.showSignature', 'i18n.logOutputEncoding',
+                        'mailmap.file', 'mailmap.blob', 'branch.sort', 'column.ui', 'column.branch')
+    
+    _LOG_FORMATS = (['--pretty=format:%H|%an|%ae|%ad|%s', '--date=iso'],)
+    
+    @staticmethod
+    def available() -> bool:
+        """Whether pygit2 could be imported."""
+        return pygit2 is not None
+    
+    async def run_git_command(self, command: List[str], cwd: Optional[Path] = None) -> Tuple[str, str, int]:
+        """Answer command with libgit2 when it is an emulated query, otherwise run git."""
+        if cwd is not None:
+            try:
+                result = await asyncio.to_thread(self._query, list(command), str(cwd))
+            except (pygit2.GitError, KeyError, ValueError, OSError):
+                result = None  # Let the CLI produce its usual output and errors
+            if result is not None:
+                return result
+        return await super().run_git_command(command, cwd)
+    
+    def _query(self, command: List[str], cwd: str) -> Optional[Tuple[str, str, int]]:
+        """Run an emulated query; None means the git CLI has to answer it."""
+        if command == ['rev-parse', '--git-dir']:
+            git_dir = pygit2.discover_repository(cwd)
+            return (git_dir.rstrip('/') + '\n', '', 0) if git_dir else None
+        
+        is_log = (len(command) >= 2 and command[0] == 'log' and _LOG_LIMIT_RE.fullmatch(command[1])
+                  and command[2:] in self._LOG_FORMATS)
+        if not (is_log or command in (['branch'], ['branch', '-a'], ['remote', '-v'])):
+            return None
+        
+        # A fresh Repository per query: pygit2 objects must not be shared between threads
+        repo = pygit2.Repository(cwd)
+        if repo.head_is_detached or repo.list_worktrees():
+            return None
+        if any(key in repo.config for key in self._CLI_ONLY_CONFIG):
+            return None
+        
+        if is_log:
+            if repo.head_is_unborn or os.path.exists(os.path.join(repo.workdir or '', '.mailmap')):
+                return None
+            return self._log(repo, int(command[1][1:]))
+        if command[0] == 'branch':
+            return self._branches(repo, list_all=len(command) == 2), '', 0
+        return self._remotes(repo)
+    
+    @staticmethod
+    def _branches(repo: 'pygit2.Repository', list_all: bool) -> str:
+        """`git branch [-a]` output."""
+        current = None if repo.head_is_unborn else repo.head.shorthand
+        lines = [('* ' if name == current else '  ') + name for name in sorted(repo.branches.local)]
+        if list_all:
+            for name in sorted(repo.branches.remote):
+                ref = repo.references['refs/remotes/' + name]
+                if ref.type == ReferenceType.SYMBOLIC:
+                    target = ref.target.removeprefix('refs/remotes/')
+                    lines.append(f'  remotes/{name} -> {target}')
+                else:
+                    lines.append(f'  remotes/{name}')
+        return ''.join(line + '\n' for line in lines)
+    
+    @staticmethod
+    def _remotes(repo: 'pygit2.Repository') -> Optional[Tuple[str, str, int]]:
+        """`git remote -v` output, unless URL rewriting or multiple URLs are configured."""
+        if any(entry.name.startswith('url.') for entry in repo.config):
+            return None
+        
+        lines = []
+        for remote in sorted(repo.remotes, key=lambda r: r.name):
+            config = repo.config
+            if (len(list(config.get_multivar(f'remote.{remote.name}.url'))) > 1
+                    or len(list(config.get_multivar(f'remote.{remote.name}.pushurl'))) > 1):
+                return None
+            lines.append(f'{remote.name}\t{remote.url} (fetch)\n')
+            lines.append(f'{remote.name}\t{remote.push_url or remote.url} (push)\n')
+        return ''.join(lines), '', 0
+    
+    @staticmethod
+    def _log(repo: 'pygit2.Repository', limit: int) -> Tuple[str, str, int]:
+        """`git log -N` in the pipe-separated detail format GitOperations.log asks for."""
+        lines = []
+        for commit in itertools.islice(repo.walk(repo.head.target, SortMode.TIME), limit):
+            author = commit.author
+            tz = timezone(timedelta(minutes=author.offset))
+            date = datetime.fromtimestamp(author.time, tz).strftime('%Y-%m-%d %H:%M:%S %z')
+            lines.append(f'{commit.id}|{author.name}|{author.email}|{date}|{_commit_subject(commit.message)}')
+        return '\n'.join(lines), '', 0
+
+
+def _commit_subject(message: str) -> str:
+    """A commit's subject as git's %s prints it: the first paragraph on one line."""
+    subject = []
+    for line in message.lstrip('\n').split('\n'):
+        line = line.rstrip()
+        if not line:
+            break
+        subject.append(line)
+    return ' '.join(subject)
+
+
+def _parse_log_changes(changes: str) -> List[Dict[str, Any]]:
+    """Parse the NUL-separated --raw/--numstat entries that follow one commit in git log -z."""
+    files: Dict[str, Dict[str, Any]] = {}
+    tokens = changes.lstrip('\x00\n').split('\x00')
+    i = 0
+    while i < len(tokens):
+        token = tokens[i].lstrip('\n')
+        i += 1
+        if token.startswith(':'):
+            # :old_mode new_mode old_oid new_oid STATUS, then the path (two for renames/copies)
+            status = token.split(' ')[-1]
+            entry = {"path": tokens[i], "status": status[0]}
+            i += 1
+            if status[0] in 'RC':
+                entry["old_path"], entry["path"] = entry["path"], tokens[i]
+                i += 1
+            files[entry["path"]] = entry
+        elif token:
+            # additions, deletions and the path; renames leave it empty and follow with both paths
+            added, deleted, file_path = token.split('\t', 2)
+            if not file_path:
+                file_path = tokens[i + 1]
+                i += 2
+            entry = files.setdefault(file_path, {"path": file_path})
+            # Binary files report '-' for both counts
+            entry["additions"] = int(added) if added != '-' else None
+            entry["deletions"] = int(deleted) if deleted != '-' else None
+    return list(files.values())
+
+
 class SSHGitOperations(GitOperationsInterface):
     """Remote git operations over SSH."""
     
@@ -95,29 +250,115 @@ class SSHGitOperations(GitOperationsInterface):
 class GitOperations:
     """High-level git operations that work with both local and remote repositories."""
     
+    # Results of read-only queries are reused this long (seconds); agents tend to
+    # ask for branches, remotes and the log back to back
+    READ_CACHE_TTL = 1.0
+    
+    # The log below a given HEAD commit never changes, so it is cached by commit id
+    # without a TTL; this many entries are kept
+    LOG_CACHE_SIZE = 64
+    
     def __init__(self, git_ops: GitOperationsInterface, file_ops: FileOperationsInterface, project_dir: Path):
         self.git_ops = git_ops
         self.file_ops = file_ops
         self.project_dir = project_dir
+        self._read_cache: Dict[Tuple[str, Tuple[str, ...]], Tuple[float, Tuple[str, str, int]]] = {}
+        self._git_dirs: Dict[str, Path] = {}
+        self._log_cache: Dict[Tuple[str, str, Tuple[str, ...]], Tuple[str, str, int]] = {}
+    
+    def _invalidate_read_cache(self) -> None:
+        """Forget cached query results after a command that may change refs or the work tree."""
+        self._read_cache.clear()
+        self._log_cache.clear()
+        self.file_ops.forget_cached_stats()
+    
+    async def _head_commit(self, work_dir: Path) -> Optional[str]:
+        """HEAD's commit id read straight from the git dir, or None when that is not simple."""
+        if not await self._is_repository(work_dir):
+            return None
+        git_dir = self._git_dirs[str(work_dir)]
+        
+        try:
+            head = (await self.file_ops.read_file(git_dir / 'HEAD')).strip()
+            if not head.startswith('ref: '):
+                return head or None  # Detached
+            ref = head[5:]
+            try:
+                return (await self.file_ops.read_file(git_dir / ref)).strip() or None
+            except Exception:
+                # Not a loose ref; look it up among the packed ones
+                packed = await self.file_ops.read_file(git_dir / 'packed-refs')
+        except Exception:
+            return None
+        
+        for line in packed.splitlines():
+            if line.endswith(' ' + ref) and not line.startswith(('#', '^')):
+                return line.split(' ', 1)[0]
+        return None  # Unborn branch, or refs kept elsewhere (worktrees, reftable)
+    
+    async def _is_repository(self, work_dir: Path) -> bool:
+        """Check for a repository, reusing the git dir found earlier while its HEAD still exists."""
+        key = str(work_dir)
+        git_dir = self._git_dirs.get(key)
+        if git_dir is not None and (await self.file_ops.stat_many([git_dir / 'HEAD']))[0] is not None:
+            return True
+        
+        stdout, _, returncode = await self.git_ops.run_git_command(['rev-parse', '--git-dir'], cwd=work_dir)
+        if returncode != 0:
+            self._git_dirs.pop(key, None)
+            return False
+        
+        self._git_dirs[key] = work_dir / stdout.strip()
+        return True
+    
+    async def _run_read_command(self, command: List[str], work_dir: Path) -> Tuple[str, str, int]:
+        """Run a read-only git command, reusing a result from the last READ_CACHE_TTL seconds."""
+        key = (str(work_dir), tuple(command))
+        now = time.monotonic()
+        cached = self._read_cache.get(key)
+        if cached and now - cached[0] < self.READ_CACHE_TTL:
+            return cached[1]
+        
+        # Drop expired entries so the cache stays small
+        for stale in [k for k, (stamp, _) in self._read_cache.items() if now - stamp >= self.READ_CACHE_TTL]:
+            del self._read_cache[stale]
+        
+        result = await self.git_ops.run_git_command(command, cwd=work_dir)
+        self._read_cache[key] = (time.monotonic(), result)
+        return result
+    
+    async def _run_log_command(self, command: List[str], work_dir: Path) -> Tuple[str, str, int]:
+        """Run a git log command, reusing its output for as long as HEAD stays on the same commit."""
+        head = await self._head_commit(work_dir)
+        if head is None:
+            return await self._run_read_command(command, work_dir)
+        
+        key = (str(work_dir), head, tuple(command))
+        cached = self._log_cache.get(key)
+        if cached is None:
+            cached = await self.git_ops.run_git_command(command, cwd=work_dir)
+            if cached[2] == 0:
+                if len(self._log_cache) >= self.LOG_CACHE_SIZE:
+                    del self._log_cache[next(iter(self._log_cache))]
+                self._log_cache[key] = cached
+        return cached
     
     async def status(self, path: Optional[Path] = None) -> Dict[str, Any]:
         """Get git repository status."""
         work_dir = path or self.project_dir
         
-        # Check if it's a git repository
-        if not await self.git_ops.is_git_repository(work_dir):
-            return {
-                "is_repository": False,
-                "error": "Not a git repository"
-            }
-        
-        # Get status
+        # Get status; only probe for a repository to explain a failure
         stdout, stderr, returncode = await self.git_ops.run_git_command(
             ['status', '--porcelain=v1', '-b'],
             cwd=work_dir
         )
         
         if returncode != 0:
+            if not await self._is_repository(work_dir):
+                return {
+                    "is_repository": False,
+                    "error": "Not a git repository"
+                }
             return {
                 "is_repository": True,
                 "error": stderr,
@@ -129,7 +370,7 @@ class GitOperations:
         
         # First line contains branch info
         branch_line = lines[0] if lines else ""
-        branch_match = re.match(r'## (.+?)(?:\.{3}(.+?))?(?:\s+\[(.+?)\])?$', branch_line)
+        branch_match = _STATUS_BRANCH_RE.match(branch_line)
         
         current_branch = ""
         tracking_branch = ""
@@ -183,6 +424,7 @@ class GitOperations:
             ['init'],
             cwd=work_dir
         )
+        self._invalidate_read_cache()
         
         return {
             "success": returncode == 0,
@@ -192,21 +434,26 @@ class GitOperations:
             "returncode": returncode
         }
     
-    async def clone(self, url: str, path: Optional[Path] = None, branch: Optional[str] = None) -> Dict[str, Any]:
-        """Clone a remote repository."""
+    async def clone(self, url: str, path: Optional[Path] = None, branch: Optional[str] = None,
+                    depth: Optional[int] = None) -> Dict[str, Any]:
+        """Clone a remote repository, optionally truncating history to depth commits."""
         work_dir = path or self.project_dir
         
         command = ['clone', url, str(work_dir)]
         if branch:
             command.extend(['-b', branch])
+        if depth:
+            command.extend([f'--depth={depth}', '--single-branch'])
         
         stdout, stderr, returncode = await self.git_ops.run_git_command(command)
+        self._invalidate_read_cache()
         
         return {
             "success": returncode == 0,
             "url": url,
             "path": str(work_dir),
             "branch": branch,
+            "depth": depth,
             "stdout": stdout,
             "stderr": stderr,
             "returncode": returncode
@@ -224,6 +471,7 @@ class GitOperations:
             command,
             cwd=work_dir
         )
+        self._invalidate_read_cache()
         
         return {
             "success": returncode == 0,
@@ -241,11 +489,12 @@ class GitOperations:
             ['commit', '-m', message],
             cwd=work_dir
         )
+        self._invalidate_read_cache()
         
         # Extract commit hash if successful
         commit_hash = ""
         if returncode == 0:
-            match = re.search(r'\[.*\s+([a-f0-9]+)\]', stdout)
+            match = _COMMIT_HASH_RE.search(stdout)
             if match:
                 commit_hash = match.group(1)
         
@@ -273,6 +522,7 @@ class GitOperations:
             command,
             cwd=work_dir
         )
+        self._invalidate_read_cache()
         
         return {
             "success": returncode == 0,
@@ -296,6 +546,7 @@ class GitOperations:
             command,
             cwd=work_dir
         )
+        self._invalidate_read_cache()
         
         return {
             "success": returncode == 0,
@@ -317,10 +568,7 @@ class GitOperations:
         else:
             command.extend(['--pretty=format:%H|%an|%ae|%ad|%s', '--date=iso'])
         
-        stdout, stderr, returncode = await self.git_ops.run_git_command(
-            command,
-            cwd=work_dir
-        )
+        stdout, stderr, returncode = await self._run_log_command(command, work_dir)
         
         commits = []
         if returncode == 0 and stdout:
@@ -347,6 +595,49 @@ class GitOperations:
             "returncode": returncode
         }
     
+    async def log_batch(self, limit: int = 10, include_stats: bool = True, include_files: bool = True,
+                        path: Optional[Path] = None) -> Dict[str, Any]:
+        """Get commits with their bodies, changed files and line counts from one git log."""
+        work_dir = path or self.project_dir
+        
+        # Fields are separated by \x1f and each header ends with \x02; -z NUL-separates
+        # the file entries so any path survives unquoted
+        command = ['log', f'-{limit}', '--format=%x01%H%x1f%an%x1f%ae%x1f%aI%x1f%s%x1f%b%x02']
+        if include_files:
+            command.extend(['--raw', '--no-abbrev', '-M'])
+        if include_stats:
+            command.append('--numstat')
+        if include_files or include_stats:
+            command.append('-z')
+        
+        stdout, stderr, returncode = await self._run_log_command(command, work_dir)
+        
+        commits = []
+        if returncode == 0:
+            for record in stdout.split('\x01')[1:]:
+                header, _, changes = record.partition('\x02')
+                fields = header.split('\x1f')
+                if len(fields) != 6:
+                    continue
+                commit = {
+                    "hash": fields[0],
+                    "author": fields[1],
+                    "email": fields[2],
+                    "date": fields[3],
+                    "message": fields[4],
+                    "body": fields[5].strip()
+                }
+                if include_files or include_stats:
+                    commit["files"] = _parse_log_changes(changes)
+                commits.append(commit)
+        
+        return {
+            "success": returncode == 0,
+            "commits": commits,
+            "stderr": stderr,
+            "returncode": returncode
+        }
+    
     async def branch(self, create: Optional[str] = None, delete: Optional[str] = None,
                     list_all: bool = False, path: Optional[Path] = None) -> Dict[str, Any]:
         """Manage git branches."""
@@ -361,10 +652,14 @@ class GitOperations:
             if list_all:
                 command.append('-a')
         
-        stdout, stderr, returncode = await self.git_ops.run_git_command(
-            command,
-            cwd=work_dir
-        )
+        if create or delete:
+            stdout, stderr, returncode = await self.git_ops.run_git_command(
+                command,
+                cwd=work_dir
+            )
+            self._invalidate_read_cache()
+        else:
+            stdout, stderr, returncode = await self._run_read_command(command, work_dir)
         
         branches = []
         current_branch = ""
@@ -412,6 +707,7 @@ class GitOperations:
             command,
             cwd=work_dir
         )
+        self._invalidate_read_cache()
         
         return {
             "success": returncode == 0,
@@ -457,10 +753,14 @@ class GitOperations:
         else:
             command = ['remote', '-v']
         
-        stdout, stderr, returncode = await self.git_ops.run_git_command(
-            command,
-            cwd=work_dir
-        )
+        if command[1] in ('add', 'remove'):
+            stdout, stderr, returncode = await self.git_ops.run_git_command(
+                command,
+                cwd=work_dir
+            )
+            self._invalidate_read_cache()
+        else:
+            stdout, stderr, returncode = await self._run_read_command(command, work_dir)
         
         remotes = []
         if returncode == 0 and action == "list":
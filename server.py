@@ -7,20 +7,28 @@ Provides comprehensive file system operations through MCP
 import os
 import re
 import stat
+import shlex
 import shutil
 import base64
 import mimetypes
+import types
 import asyncio
 import difflib
+import fnmatch
+import functools
+import inspect
+import math
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union, Iterator, Tuple, AsyncIterator
+from typing import List, Dict, Any, Optional, Union, Iterator, Tuple, AsyncIterator, Callable
 from datetime import datetime
 
 from code_analyzer import CodeAnalyzer, list_functions, get_function_at_line, get_code_structure, search_functions
 from mcp.server.fastmcp import FastMCP
-from file_operations import FileOperationsInterface, LocalFileOperations, SSHFileOperations
-from ssh_manager import SSHConnectionManager
-from git_operations import GitOperations, LocalGitOperations, SSHGitOperations
+from file_operations import FileOperationsInterface, LocalFileOperations, SSHFileOperations, count_file_lines
+from ssh_manager import SSHConnectionManager, lazy_import
+from git_operations import GitOperations, LocalGitOperations, Pygit2GitOperations, SSHGitOperations
+
+asyncssh = lazy_import('asyncssh')
 
 # Create the MCP server instance
 mcp = FastMCP("file-editor")
@@ -52,6 +60,25 @@ BINARY_EXTENSIONS = {
     '.ttf', '.otf', '.woff', '.woff2', '.eot'
 }
 
+# Suffix -> file type lookup built once from the sets above (text wins on overlap)
+_EXT_TYPE = types.MappingProxyType({
+    **{ext: "binary" for ext in BINARY_EXTENSIONS},
+    **{ext: "text" for ext in TEXT_EXTENSIONS}
+})
+
+# Compiled and packed formats that search/replace never open, even where the tables
+# above list them as text (.pyc) or don't know them at all
+SEARCH_SKIP_SUFFIXES = frozenset({
+    '.png', '.jpg', '.jpeg', '.gif', '.pdf', '.zip', '.tar', '.gz', '.xz', '.bz2', '.7z',
+    '.so', '.dylib', '.dll', '.exe', '.o', '.a', '.pyc', '.pyo', '.class', '.jar', '.wasm',
+    '.woff', '.woff2', '.ttf', '.otf', '.eot', '.ico',
+    '.mp3', '.mp4', '.mov', '.avi', '.webm', '.mkv', '.webp'
+})
+
+# The most common suffixes, checked before the table lookup
+_HOT_TEXT_SUFFIXES = ('.py', '.js', '.md', '.html', '.json')
+_HOT_BINARY_SUFFIXES = ('.png', '.jpg')
+
 # Global base directory (current working directory)
 BASE_DIR = Path.cwd()
 
@@ -59,18 +86,50 @@ BASE_DIR = Path.cwd()
 PROJECT_DIR = None
 
 # Global file operations backend and SSH manager
-FILE_OPS: FileOperationsInterface = LocalFileOperations()
+LOCAL_OPS = LocalFileOperations()  # Shared local backend, also used for SSH transfers
+FILE_OPS: FileOperationsInterface = LOCAL_OPS
 SSH_MANAGER = SSHConnectionManager()
 CONNECTION_TYPE = "local"  # "local" or "ssh"
 GIT_OPS: Optional[GitOperations] = None  # Initialized when needed
 
+# Files read (or rewritten) concurrently by search_files / replace_in_files
+SEARCH_CONCURRENCY = 32
+REPLACE_CONCURRENCY = 16
+
 def is_safe_path(path: Path) -> bool:
     """Check if a path is safe to access (no directory traversal)"""
     try:
-        resolved = path.resolve()
-        return resolved.is_relative_to(BASE_DIR)
-    except (ValueError, RuntimeError):
+        # One realpath() for the target; the containment test is plain string work
+        resolved = os.path.realpath(path)
+    except (ValueError, OSError):
         return False
+    base, prefix = _base_prefixes(BASE_DIR)
+    return resolved == base or resolved.startswith(prefix)
+
+
+@functools.lru_cache(maxsize=8)
+def _base_prefixes(base_dir: Path) -> Tuple[str, str]:
+    """The base directory as a string, with and without a trailing separator"""
+    base = str(base_dir)
+    return base, os.path.join(base, '')
+
+
+def _is_missing_file_error(error: Exception) -> bool:
+    """Whether a file operation failed because the path (or a parent) does not exist"""
+    # Checked in this order so a local error never triggers loading asyncssh
+    return (isinstance(error, (FileNotFoundError, NotADirectoryError))
+            or isinstance(error, asyncssh.SFTPNoSuchFile))
+
+
+def _relative_to_base(path: Path) -> Optional[str]:
+    """Return path relative to BASE_DIR, or None if it lies outside it"""
+    path_str = str(path)
+    base, prefix = _base_prefixes(BASE_DIR)
+    if path_str == base:
+        return "."
+    if path_str.startswith(prefix):
+        return path_str[len(prefix):]
+    return None
 
 
 def get_git_operations() -> Optional[GitOperations]:
@@ -79,15 +138,54 @@ def get_git_operations() -> Optional[GitOperations]:
     
     if GIT_OPS is None and PROJECT_DIR is not None:
         if CONNECTION_TYPE == "ssh":
+            # Built afresh for each connection, so it never outlives the one it runs over
             git_backend = SSHGitOperations(SSH_MANAGER.connection, SSH_MANAGER.sftp)
+            GIT_OPS = GitOperations(git_backend, FILE_OPS, PROJECT_DIR)
         else:
-            git_backend = LocalGitOperations()
-        
-        GIT_OPS = GitOperations(git_backend, FILE_OPS, PROJECT_DIR)
+            GIT_OPS = _local_git_ops_for(PROJECT_DIR)
     
     return GIT_OPS
 
 
+def requires_git_ops(tool: Callable) -> Callable:
+    """
+    Decorator for git tools that need the current project's GitOperations.
+    
+    The wrapped tool receives it as its first argument and its path argument
+    as a Path (or None); the first parameter is hidden from the tool schema.
+    """
+    signature = inspect.signature(tool)
+    public_signature = signature.replace(parameters=list(signature.parameters.values())[1:])
+    
+    @functools.wraps(tool)
+    async def wrapper(*args, **kwargs):
+        git_ops = get_git_operations()
+        if not git_ops:
+            raise ValueError("No project directory set. Use set_project_directory first.")
+        
+        if args:
+            kwargs = public_signature.bind(*args, **kwargs).arguments
+        path = kwargs.get('path')
+        kwargs['path'] = _cached_path(path) if path else None
+        return await tool(git_ops, **kwargs)
+    
+    wrapper.__signature__ = public_signature
+    return wrapper
+
+
+@functools.lru_cache(maxsize=32)
+def _local_git_ops_for(project_dir: Path) -> GitOperations:
+    """GitOperations for a local project (memoized, so its caches survive switching projects)"""
+    git_backend = Pygit2GitOperations() if Pygit2GitOperations.available() else LocalGitOperations()
+    return GitOperations(git_backend, FILE_OPS, project_dir)
+
+
+@functools.lru_cache(maxsize=128)
+def _cached_path(path: str) -> Path:
+    """Path for a git tool's repository argument (memoized; Path objects are immutable)"""
+    return Path(path)
+
+
 def resolve_path(path: str) -> Path:
     """
     Resolve a path relative to project directory if set, otherwise relative to BASE_DIR.
@@ -98,6 +196,12 @@ def resolve_path(path: str) -> Path:
     Returns:
         Resolved Path object
     """
+    return _resolve_path(path, PROJECT_DIR, BASE_DIR)
+
+
+@functools.lru_cache(maxsize=2048)
+def _resolve_path(path: str, project_dir: Optional[Path], base_dir: Path) -> Path:
+    """resolve_path for given directories (memoized; clients pass the same paths again and again)"""
     path_obj = Path(path)
     
     # If path is absolute, return as-is
@@ -105,43 +209,113 @@ def resolve_path(path: str) -> Path:
         return path_obj
     
     # If project directory is set, resolve relative to it
-    if PROJECT_DIR:
-        return PROJECT_DIR / path
+    if project_dir:
+        return project_dir / path
     
     # Otherwise, resolve relative to BASE_DIR
-    return BASE_DIR / path
+    return base_dir / path
+
+
+@functools.lru_cache(maxsize=256)
+def _file_type_by_suffix(suffix: str) -> str:
+    """Classify a non-empty suffix (memoized; every file with the same suffix shares the answer)"""
+    file_type = _EXT_TYPE.get(suffix) or _EXT_TYPE.get(suffix.lower())
+    if file_type:
+        return file_type
+    
+    # Fall back to mimetypes for suffixes outside the tables
+    mime_type, _ = mimetypes.guess_type("file" + suffix.lower())
+    if mime_type:
+        if mime_type.startswith('text/'):
+            return "text"
+        elif mime_type.startswith(('image/', 'audio/', 'video/', 'application/')):
+            return "binary"
+    return "unknown"
 
 
 def get_file_type(path: Path) -> str:
     """Determine file type"""
-    suffix = path.suffix.lower()
-    if suffix in TEXT_EXTENSIONS or path.name in TEXT_EXTENSIONS:
+    suffix = path.suffix
+    if suffix in _HOT_TEXT_SUFFIXES:
         return "text"
-    elif suffix in BINARY_EXTENSIONS:
+    if suffix in _HOT_BINARY_SUFFIXES:
         return "binary"
-    else:
-        # Try to detect using mimetypes
-        mime_type, _ = mimetypes.guess_type(str(path))
-        if mime_type:
-            if mime_type.startswith('text/'):
-                return "text"
-            elif mime_type.startswith(('image/', 'audio/', 'video/', 'application/')):
-                return "binary"
-        return "unknown"
-
-async def get_file_info_async(path: Path) -> Dict[str, Any]:
+    if suffix:
+        return _file_type_by_suffix(suffix)
+    # Dotfiles such as .gitignore have no suffix and are listed by name
+    return "text" if path.name in TEXT_EXTENSIONS else "unknown"
+
+@functools.lru_cache(maxsize=4096)
+def _iso_second(seconds: int) -> str:
+    """Local ISO-8601 text for a whole-second timestamp (memoized; files in a tree share seconds)"""
+    return datetime.fromtimestamp(seconds).isoformat()
+
+def _iso_timestamp(ts: float) -> str:
+    """Format a stat timestamp exactly as datetime.fromtimestamp(ts).isoformat() does"""
+    # Split off microseconds with fromtimestamp's own rounding, so only whole seconds are cached
+    fraction, seconds = math.modf(ts)
+    micros = round(fraction * 1e6)
+    if micros >= 1000000:
+        seconds += 1
+        micros -= 1000000
+    elif micros < 0:
+        seconds -= 1
+        micros += 1000000
+    text = _iso_second(int(seconds))
+    return f"{text}.{micros:06d}" if micros else text
+
+@functools.lru_cache(maxsize=256)
+def _compile_name_pattern(pattern: str) -> Callable[[str], Any]:
+    """Compile a glob once into a matcher equivalent to fnmatch.fnmatch(name, pattern)"""
+    match = re.compile(fnmatch.translate(os.path.normcase(pattern))).match
+    if os.path.normcase('A') == 'A':
+        return match
+    # Case-insensitive filesystems: normalise names the same way fnmatch does
+    return lambda name: match(os.path.normcase(name))
+
+# CPU-bound work (base64, regex scans) on payloads larger than this runs in a worker
+# thread to keep the event loop free
+THREAD_OFFLOAD_THRESHOLD = 1024 * 1024
+
+@functools.lru_cache(maxsize=1024)
+def _compile_regex(pattern: str, flags: int = 0) -> re.Pattern:
+    """Compile a user-supplied regex (memoized; clients repeat patterns across tool calls)"""
+    return re.compile(pattern, flags)
+
+_REGEX_SPECIAL_RE = re.compile(r'[.^$*+?{}\[\]\\|()]')
+
+def _literal_text(pattern: str) -> Optional[str]:
+    """Return pattern if it contains no regex syntax, so a substring test can rule files out"""
+    if pattern and not _REGEX_SPECIAL_RE.search(pattern):
+        return pattern
+    return None
+
+# search_files reads files in pieces of about this many bytes, bounding memory per file
+SEARCH_CHUNK_SIZE = 8 * 1024 * 1024
+
+def _b64encode_str(data: bytes, chunk_size: int = 3 * 16384) -> str:
+    """Base64-encode to str in 3-byte-aligned chunks, avoiding a full-size bytes copy"""
+    view = memoryview(data)
+    return ''.join(
+        base64.b64encode(view[i:i + chunk_size]).decode('ascii')
+        for i in range(0, len(view), chunk_size)
+    )
+
+async def get_file_info_async(path: Path, stat_info: Optional[os.stat_result] = None) -> Dict[str, Any]:
     """Get detailed file information using the current file operations backend"""
     try:
-        stat_info = await FILE_OPS.stat(path)
+        if stat_info is None:
+            stat_info = await FILE_OPS.stat(path)
+        is_dir = stat.S_ISDIR(stat_info.st_mode)
         file_type = get_file_type(path)
         
         info = {
             "name": path.name,
             "path": str(path),
-            "type": "directory" if await FILE_OPS.is_dir(path) else "file",
+            "type": "directory" if is_dir else "file",
             "size": stat_info.st_size,
-            "modified": datetime.fromtimestamp(stat_info.st_mtime).isoformat(),
-            "created": datetime.fromtimestamp(stat_info.st_ctime).isoformat(),
+            "modified": _iso_timestamp(stat_info.st_mtime),
+            "created": _iso_timestamp(stat_info.st_ctime),
             "permissions": stat.filemode(stat_info.st_mode),
             "file_type": file_type
         }
@@ -149,16 +323,12 @@ async def get_file_info_async(path: Path) -> Dict[str, Any]:
         # Add absolute path for local connections
         if CONNECTION_TYPE == "local":
             info["absolute_path"] = str(path.absolute())
-            try:
-                info["relative_path"] = str(path.relative_to(BASE_DIR))
-            except ValueError:
-                info["relative_path"] = str(path)
+            info["relative_path"] = _relative_to_base(path) or str(path)
         
         # Add line count for text files
-        if file_type == "text" and not await FILE_OPS.is_dir(path):
+        if file_type == "text" and not is_dir:
             try:
-                content = await FILE_OPS.read_file(path)
-                info["line_count"] = len(content.splitlines())
+                info["line_count"] = await FILE_OPS.count_lines(path)
             except:
                 info["line_count"] = None
         
@@ -171,29 +341,41 @@ async def get_file_info_async(path: Path) -> Dict[str, Any]:
             "error": str(e)
         }
 
-def get_file_info_sync(path: Path) -> Dict[str, Any]:
-    """Get detailed file information"""
+def get_file_info_sync(entry: Union[Path, os.DirEntry]) -> Dict[str, Any]:
+    """
+    Get detailed file information for a local path.
+    
+    Accepts an os.DirEntry from os.scandir() so the stat data cached on the
+    entry is reused instead of stat-ing the path again. Returns the same
+    fields as get_file_info_async for local connections.
+    """
+    path = Path(entry)
     try:
-        stat_info = path.stat()
+        if isinstance(entry, os.DirEntry):
+            stat_info = entry.stat()
+        else:
+            stat_info = path.stat()
+        is_dir = stat.S_ISDIR(stat_info.st_mode)
         file_type = get_file_type(path)
         
         info = {
             "name": path.name,
-            "path": str(path.relative_to(BASE_DIR)),
-            "absolute_path": str(path.absolute()),
-            "type": "directory" if path.is_dir() else "file",
+            "path": str(path),
+            "type": "directory" if is_dir else "file",
             "size": stat_info.st_size,
-            "modified": datetime.fromtimestamp(stat_info.st_mtime).isoformat(),
-            "created": datetime.fromtimestamp(stat_info.st_ctime).isoformat(),
+            "modified": _iso_timestamp(stat_info.st_mtime),
+            "created": _iso_timestamp(stat_info.st_ctime),
             "permissions": stat.filemode(stat_info.st_mode),
-            "file_type": file_type
+            "file_type": file_type,
+            "absolute_path": str(path.absolute())
         }
         
+        info["relative_path"] = _relative_to_base(path) or str(path)
+        
         # Add line count for text files
-        if file_type == "text" and path.is_file():
+        if file_type == "text" and stat.S_ISREG(stat_info.st_mode):
             try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    info["line_count"] = sum(1 for _ in f)
+                info["line_count"] = count_file_lines(path)
             except:
                 info["line_count"] = None
                 
@@ -201,9 +383,46 @@ def get_file_info_sync(path: Path) -> Dict[str, Any]:
     except Exception as e:
         return {
             "name": path.name,
+            "path": str(path),
+            "type": "unknown",
             "error": str(e)
         }
 
+def _list_files_sync(
+    target_path: Path,
+    pattern: str,
+    recursive: bool,
+    include_hidden: bool,
+    max_depth: Optional[int]
+) -> List[Dict[str, Any]]:
+    """Synchronous local counterpart of list_files built on os.scandir"""
+    matches = _compile_name_pattern(pattern)
+    results = []
+    
+    def _scan(current_path: Union[Path, str], current_depth: int) -> None:
+        if max_depth is not None and current_depth > max_depth:
+            return
+        
+        # os.scandir caches each entry's stat, so no extra syscalls per entry
+        subdirs = []
+        with os.scandir(current_path) as entries:
+            for entry in entries:
+                if matches(entry.name) and (include_hidden or not entry.name.startswith('.')):
+                    results.append(get_file_info_sync(entry))
+                
+                if recursive and entry.is_dir():
+                    subdirs.append(entry.path)
+        
+        # Descend after the directory's own entries, matching walk_with_depth_async's order
+        for subdir in subdirs:
+            try:
+                _scan(subdir, current_depth + 1)
+            except OSError:
+                pass  # Skip inaccessible directories
+    
+    _scan(target_path, 0)
+    return results
+
 @mcp.tool()
 async def list_files(
     path: str = ".",
@@ -231,35 +450,44 @@ async def list_files(
     if CONNECTION_TYPE == "local" and not is_safe_path(target_path):
         raise ValueError("Invalid path: directory traversal detected")
     
-    # Check if path exists
-    if not await FILE_OPS.exists(target_path):
-        raise ValueError(f"Path does not exist: {path}")
-    
-    # Verify it's a directory
+    # Verify it's a directory; only probe existence to pick the error message
     if not await FILE_OPS.is_dir(target_path):
+        if not await FILE_OPS.exists(target_path):
+            raise ValueError(f"Path does not exist: {path}")
         raise ValueError(f"Path is not a directory: {path}")
     
+    if CONNECTION_TYPE == "local":
+        # Scan and stat in a worker thread so large trees don't block the event loop
+        return await asyncio.to_thread(_list_files_sync, target_path, pattern, recursive, include_hidden, max_depth)
+    
     results = []
     
     if recursive:
-        # Use async walk for recursive listing
-        async for item in walk_with_depth_async(target_path, pattern, max_depth):
-            if not include_hidden and item.name.startswith('.'):
-                continue
-            info = await get_file_info_async(item)
+        # Use async walk for recursive listing, then stat the matches in one batch
+        items = []
+        async for dir_path, entries in walk_with_depth_async(target_path, pattern, max_depth):
+            for entry_name, _, _ in entries:
+                if not include_hidden and entry_name.startswith('.'):
+                    continue
+                items.append(dir_path / entry_name)
+        
+        stats = await FILE_OPS.stat_many(items)
+        for item, stat_info in zip(items, stats):
+            # A failed stat is retried inside get_file_info_async to report the error
+            info = await get_file_info_async(item, stat_info)
             results.append(info)
     else:
-        # List directory contents
-        entries = await FILE_OPS.listdir(target_path)
-        import fnmatch
+        # List directory contents along with their attributes in one request
+        entries = await FILE_OPS.listdir_stat(target_path)
+        matches = _compile_name_pattern(pattern)
         
-        for entry_name in entries:
+        for entry_name, stat_info in entries:
             if not include_hidden and entry_name.startswith('.'):
                 continue
             
-            if fnmatch.fnmatch(entry_name, pattern):
+            if matches(entry_name):
                 entry_path = target_path / entry_name
-                info = await get_file_info_async(entry_path)
+                info = await get_file_info_async(entry_path, stat_info)
                 results.append(info)
             
     return results
@@ -289,12 +517,10 @@ async def read_file(
     if CONNECTION_TYPE == "local" and not is_safe_path(file_path):
         raise ValueError("Invalid path: directory traversal detected")
     
-    # Check if file exists
-    if not await FILE_OPS.exists(file_path):
-        raise ValueError(f"File does not exist: {path}")
-    
-    # Verify it's a file
+    # Verify it's a file; only probe existence to pick the error message
     if not await FILE_OPS.is_file(file_path):
+        if not await FILE_OPS.exists(file_path):
+            raise ValueError(f"File does not exist: {path}")
         raise ValueError(f"Not a file: {path}")
     
     file_type = get_file_type(file_path)
@@ -302,22 +528,30 @@ async def read_file(
     if file_type == "binary":
         # Read binary file and encode as base64
         content_bytes = await FILE_OPS.read_binary(file_path)
-        content = base64.b64encode(content_bytes).decode('ascii')
+        if len(content_bytes) > THREAD_OFFLOAD_THRESHOLD:
+            content = await asyncio.to_thread(_b64encode_str, content_bytes)
+        else:
+            content = base64.b64encode(content_bytes).decode('ascii')
         return {
             "content": content,
             "encoding": "base64",
             "file_type": "binary"
         }
     else:
-        # Read text file
-        content = await FILE_OPS.read_file(file_path, encoding=encoding)
-        
-        if start_line is not None or end_line is not None:
-            lines = content.splitlines(keepends=True)
-            start_idx = (start_line - 1) if start_line else 0
-            end_idx = end_line if end_line else len(lines)
-            content = ''.join(lines[start_idx:end_idx])
-                
+        start_idx = (start_line - 1) if start_line else 0
+        end_idx = end_line if end_line else None
+        
+        if (start_line is not None or end_line is not None) and start_idx >= 0 and (end_idx is None or end_idx >= 0):
+            # Only read as far as the requested range instead of splitting the whole file
+            content = await FILE_OPS.read_lines(file_path, start_idx, end_idx, encoding=encoding)
+        else:
+            # Read text file
+            content = await FILE_OPS.read_file(file_path, encoding=encoding)
+            
+            if start_line is not None or end_line is not None:
+                lines = content.splitlines(keepends=True)
+                content = ''.join(lines[start_idx:end_idx])
+        
         return {
             "content": content,
             "encoding": encoding,
@@ -356,26 +590,23 @@ async def write_file(
     # Write content
     if encoding == "base64":
         # Decode base64 and write as binary
-        content_bytes = base64.b64decode(content)
-        await FILE_OPS.write_file(file_path, content_bytes)
+        if len(content) > THREAD_OFFLOAD_THRESHOLD:
+            content_bytes = await asyncio.to_thread(base64.b64decode, content)
+        else:
+            content_bytes = base64.b64decode(content)
     else:
-        # Write as text
-        await FILE_OPS.write_file(file_path, content, encoding=encoding)
-    
-    # Get file info
-    stat_info = await FILE_OPS.stat(file_path)
+        # Encode text once here so the size is known without a stat afterwards
+        content_bytes = content.encode(encoding)
+    await FILE_OPS.write_file(file_path, content_bytes)
     
     result = {
         "path": str(file_path),
-        "size": stat_info.st_size
+        "size": len(content_bytes)
     }
     
     # Add relative path for local connections
     if CONNECTION_TYPE == "local":
-        try:
-            result["relative_path"] = str(file_path.relative_to(BASE_DIR))
-        except ValueError:
-            result["relative_path"] = str(file_path)
+        result["relative_path"] = _relative_to_base(file_path) or str(file_path)
     
     return result
 
@@ -435,7 +666,8 @@ async def ssh_upload(
     local_path: str,
     remote_path: str,
     recursive: bool = False,
-    overwrite: bool = True
+    overwrite: bool = True,
+    concurrency: int = 16
 ) -> Dict[str, Any]:
     """
     Upload file(s) from local filesystem to remote SSH server.
@@ -445,6 +677,7 @@ async def ssh_upload(
         remote_path: Remote destination path (on SSH server)
         recursive: Upload directories recursively
         overwrite: Overwrite existing files on remote
+        concurrency: Maximum number of files transferred at once
         
     Returns:
         Dictionary with upload results
@@ -452,8 +685,8 @@ async def ssh_upload(
     if CONNECTION_TYPE != "ssh":
         raise ValueError("SSH connection not established. Use set_project_directory with connection_type='ssh' first")
     
-    # Ensure we have local file operations for reading
-    local_ops = LocalFileOperations()
+    # Use the shared local file operations for local checks
+    local_ops = LOCAL_OPS
     
     # Parse paths
     local_path_obj = Path(local_path).resolve()
@@ -474,32 +707,30 @@ async def ssh_upload(
         if await local_ops.is_file(local_path_obj):
             # Upload single file
             try:
-                # Check if remote path exists and is a directory
-                remote_exists = await FILE_OPS.exists(remote_path_obj)
-                if remote_exists and await FILE_OPS.is_dir(remote_path_obj):
+                # Check if remote path exists and is a directory (one stat answers both)
+                remote_stat = (await FILE_OPS.stat_many([remote_path_obj]))[0]
+                if remote_stat is not None and stat.S_ISDIR(remote_stat.st_mode):
                     # If remote is a directory, use same filename
                     remote_file_path = remote_path_obj / local_path_obj.name
+                    remote_stat = None if overwrite else (await FILE_OPS.stat_many([remote_file_path]))[0]
                 else:
                     # Use remote path as-is
                     remote_file_path = remote_path_obj
                 
                 # Check if should overwrite
-                if await FILE_OPS.exists(remote_file_path) and not overwrite:
+                if remote_stat is not None and not overwrite:
                     errors.append({
                         "file": str(local_path_obj),
                         "error": f"Remote file exists and overwrite=False: {remote_file_path}"
                     })
                 else:
-                    # Read local file
-                    content = await local_ops.read(local_path_obj)
-                    
-                    # Write to remote
-                    await FILE_OPS.write(remote_file_path, content)
+                    # Stream the local file to the remote
+                    size = await FILE_OPS.upload_file(local_path_obj, remote_file_path)
                     
                     uploaded_files.append({
                         "local": str(local_path_obj),
                         "remote": str(remote_file_path),
-                        "size": len(content)
+                        "size": size
                     })
             except Exception as e:
                 errors.append({
@@ -515,52 +746,80 @@ async def ssh_upload(
             if not await FILE_OPS.exists(remote_path_obj):
                 await FILE_OPS.makedirs(remote_path_obj)
             
-            # Walk through local directory
-            for root, dirs, files in os.walk(local_path_obj):
-                root_path = Path(root)
-                rel_path = root_path.relative_to(local_path_obj)
-                
-                # Create directories on remote
-                for dir_name in dirs:
-                    remote_dir = remote_path_obj / rel_path / dir_name
-                    try:
-                        if not await FILE_OPS.exists(remote_dir):
-                            await FILE_OPS.makedirs(remote_dir)
-                    except Exception as e:
-                        errors.append({
-                            "file": str(root_path / dir_name),
-                            "error": f"Failed to create remote directory: {e}"
-                        })
-                
-                # Upload files
-                for file_name in files:
-                    local_file = root_path / file_name
-                    remote_file = remote_path_obj / rel_path / file_name
-                    
-                    try:
-                        if await FILE_OPS.exists(remote_file) and not overwrite:
-                            errors.append({
-                                "file": str(local_file),
-                                "error": f"Remote file exists and overwrite=False: {remote_file}"
-                            })
-                            continue
-                        
-                        # Read local file
-                        content = await local_ops.read(local_file)
-                        
-                        # Write to remote
-                        await FILE_OPS.write(remote_file, content)
-                        
-                        uploaded_files.append({
-                            "local": str(local_file),
-                            "remote": str(remote_file),
-                            "size": len(content)
-                        })
-                    except Exception as e:
-                        errors.append({
+            # Walk through local directory (off the event loop), collecting the
+            # directories and files to transfer
+            directories = []
+            transfers = []
+            for entry, rel_path in await asyncio.to_thread(list, _scandir_walk(local_path_obj)):
+                pair = (Path(entry.path), remote_path_obj / rel_path)
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                (directories if is_dir else transfers).append(pair)
+            
+            # Probe every remote directory in one pipelined batch, then create the missing
+            # ones a depth level at a time, so each level's parents already exist
+            dir_stats = await FILE_OPS.stat_many([remote_dir for _, remote_dir in directories])
+            levels: Dict[int, List[Tuple[Path, Path]]] = {}
+            for (local_dir, remote_dir), dir_stat in zip(directories, dir_stats):
+                if dir_stat is None:
+                    levels.setdefault(len(remote_dir.parts), []).append((local_dir, remote_dir))
+            
+            dir_errors: Dict[Path, str] = {}
+            
+            async def _make_dir(index: int, pair: Tuple[Path, Path]) -> None:
+                try:
+                    await FILE_OPS.makedirs(pair[1])
+                except Exception as e:
+                    dir_errors[pair[0]] = f"Failed to create remote directory: {e}"
+            
+            for depth in sorted(levels):
+                await _gather_bounded(_make_dir, levels[depth], max(1, concurrency))
+            for local_dir, _ in directories:
+                if local_dir in dir_errors:
+                    errors.append({
+                        "file": str(local_dir),
+                        "error": dir_errors[local_dir]
+                    })
+            
+            # Existing remote files only matter when they must not be overwritten
+            existing = set()
+            if not overwrite:
+                file_stats = await FILE_OPS.stat_many([remote_file for _, remote_file in transfers])
+                existing = {index for index, file_stat in enumerate(file_stats) if file_stat is not None}
+            
+            # Upload several files at once so SFTP round-trips overlap
+            outcomes: Dict[int, Tuple[bool, Dict[str, Any]]] = {}  # Keyed by walk order
+            
+            async def _upload_file(index: int, transfer: Tuple[Path, Path]) -> None:
+                local_file, remote_file = transfer
+                try:
+                    if index in existing:
+                        outcomes[index] = (False, {
                             "file": str(local_file),
-                            "error": str(e)
+                            "error": f"Remote file exists and overwrite=False: {remote_file}"
                         })
+                        return
+                    
+                    # Stream the local file to the remote
+                    size = await FILE_OPS.upload_file(local_file, remote_file)
+                    
+                    outcomes[index] = (True, {
+                        "local": str(local_file),
+                        "remote": str(remote_file),
+                        "size": size
+                    })
+                except Exception as e:
+                    outcomes[index] = (False, {
+                        "file": str(local_file),
+                        "error": str(e)
+                    })
+            
+            await _gather_bounded(_upload_file, transfers, max(1, concurrency))
+            for index in sorted(outcomes):
+                succeeded, record = outcomes[index]
+                (uploaded_files if succeeded else errors).append(record)
     
     except Exception as e:
         raise ValueError(f"Upload failed: {str(e)}")
@@ -579,7 +838,8 @@ async def ssh_download(
     remote_path: str,
     local_path: str,
     recursive: bool = False,
-    overwrite: bool = True
+    overwrite: bool = True,
+    concurrency: int = 16
 ) -> Dict[str, Any]:
     """
     Download file(s) from remote SSH server to local filesystem.
@@ -589,6 +849,7 @@ async def ssh_download(
         local_path: Local destination path
         recursive: Download directories recursively
         overwrite: Overwrite existing local files
+        concurrency: Maximum number of files transferred at once
         
     Returns:
         Dictionary with download results
@@ -596,8 +857,8 @@ async def ssh_download(
     if CONNECTION_TYPE != "ssh":
         raise ValueError("SSH connection not established. Use set_project_directory with connection_type='ssh' first")
     
-    # Ensure we have local file operations for writing
-    local_ops = LocalFileOperations()
+    # Use the shared local file operations for local checks
+    local_ops = LOCAL_OPS
     
     # Parse paths
     local_path_obj = Path(local_path).resolve()
@@ -607,15 +868,16 @@ async def ssh_download(
     if not remote_path_obj.is_absolute():
         remote_path_obj = PROJECT_DIR / remote_path_obj
     
-    # Check if remote path exists
-    if not await FILE_OPS.exists(remote_path_obj):
+    # Check if remote path exists; one stat also tells files from directories
+    remote_stat = (await FILE_OPS.stat_many([remote_path_obj]))[0]
+    if remote_stat is None:
         raise ValueError(f"Remote path does not exist: {remote_path}")
     
     downloaded_files = []
     errors = []
     
     try:
-        if await FILE_OPS.is_file(remote_path_obj):
+        if stat.S_ISREG(remote_stat.st_mode):
             # Download single file
             try:
                 # Check if local path exists and is a directory
@@ -637,16 +899,13 @@ async def ssh_download(
                     # Ensure parent directory exists
                     local_file_path.parent.mkdir(parents=True, exist_ok=True)
                     
-                    # Read remote file
-                    content = await FILE_OPS.read(remote_path_obj)
-                    
-                    # Write to local
-                    await local_ops.write(local_file_path, content)
+                    # Stream the remote file to local
+                    size = await FILE_OPS.download_file(remote_path_obj, local_file_path)
                     
                     downloaded_files.append({
                         "remote": str(remote_path_obj),
                         "local": str(local_file_path),
-                        "size": len(content)
+                        "size": size
                     })
             except Exception as e:
                 errors.append({
@@ -654,55 +913,73 @@ async def ssh_download(
                     "error": str(e)
                 })
         
-        elif await FILE_OPS.is_dir(remote_path_obj):
+        elif stat.S_ISDIR(remote_stat.st_mode):
             if not recursive:
                 raise ValueError("Directory download requires recursive=True")
             
             # Create local directory if it doesn't exist
             local_path_obj.mkdir(parents=True, exist_ok=True)
             
-            # List and download directory contents recursively
-            async def download_dir(remote_dir: Path, local_dir: Path):
-                # List remote directory contents
-                entries = await FILE_OPS.listdir(remote_dir)
+            # Walk the remote tree, creating local directories and collecting the files to transfer
+            transfers = []
+            outcomes: Dict[int, Tuple[bool, Dict[str, Any]]] = {}  # Keyed by walk order
+            
+            async def collect_dir(remote_dir: Path, local_dir: Path):
+                # One listing gives the entry types, so no per-entry stat is needed
+                entries = await FILE_OPS.scandir(remote_dir)
                 
-                for entry in entries:
+                for entry, is_dir, _ in entries:
                     remote_entry = remote_dir / entry
                     local_entry = local_dir / entry
                     
-                    try:
-                        if await FILE_OPS.is_dir(remote_entry):
+                    if is_dir:
+                        try:
                             # Create local directory
                             local_entry.mkdir(exist_ok=True)
-                            # Recursively download subdirectory
-                            await download_dir(remote_entry, local_entry)
-                        else:
-                            # Download file
-                            if await local_ops.exists(local_entry) and not overwrite:
-                                errors.append({
-                                    "file": str(remote_entry),
-                                    "error": f"Local file exists and overwrite=False: {local_entry}"
-                                })
-                                continue
-                            
-                            # Read remote file
-                            content = await FILE_OPS.read(remote_entry)
-                            
-                            # Write to local
-                            await local_ops.write(local_entry, content)
-                            
-                            downloaded_files.append({
-                                "remote": str(remote_entry),
-                                "local": str(local_entry),
-                                "size": len(content)
+                            # Recursively collect subdirectory
+                            await collect_dir(remote_entry, local_entry)
+                        except Exception as e:
+                            outcomes[len(transfers)] = (False, {
+                                "file": str(remote_entry),
+                                "error": str(e)
                             })
-                    except Exception as e:
-                        errors.append({
+                            transfers.append(None)
+                    else:
+                        transfers.append((remote_entry, local_entry))
+            
+            async def download_file(index: int, transfer: Optional[Tuple[Path, Path]]) -> None:
+                if transfer is None:
+                    return  # Placeholder keeping a directory error in walk order
+                remote_entry, local_entry = transfer
+                try:
+                    if await local_ops.exists(local_entry) and not overwrite:
+                        outcomes[index] = (False, {
                             "file": str(remote_entry),
-                            "error": str(e)
+                            "error": f"Local file exists and overwrite=False: {local_entry}"
                         })
+                        return
+                    
+                    # Stream the remote file to local
+                    size = await FILE_OPS.download_file(remote_entry, local_entry)
+                    
+                    outcomes[index] = (True, {
+                        "remote": str(remote_entry),
+                        "local": str(local_entry),
+                        "size": size
+                    })
+                except Exception as e:
+                    outcomes[index] = (False, {
+                        "file": str(remote_entry),
+                        "error": str(e)
+                    })
             
-            await download_dir(remote_path_obj, local_path_obj)
+            await collect_dir(remote_path_obj, local_path_obj)
+            
+            # Download several files at once so SFTP round-trips overlap
+            await _gather_bounded(download_file, transfers, max(1, concurrency))
+            for index in sorted(outcomes):
+                succeeded, record = outcomes[index]
+                (downloaded_files if succeeded else errors).append(record)
     
     except Exception as e:
         raise ValueError(f"Download failed: {str(e)}")
@@ -716,6 +993,12 @@ async def ssh_download(
     }
 
 
+@functools.lru_cache(maxsize=1)
+def _rsync_available() -> bool:
+    """Whether an rsync binary is on PATH (looked up once)"""
+    return shutil.which('rsync') is not None
+
+
 @mcp.tool()
 async def ssh_sync(
     local_path: str,
@@ -748,8 +1031,15 @@ async def ssh_sync(
         raise ValueError("Direction must be 'upload' or 'download'")
     
     # Get SSH connection details
-    if not SSH_HOST or not SSH_USERNAME:
+    params = SSH_MANAGER.connection_params
+    if not params:
         raise ValueError("SSH host and username not configured")
+    if not _rsync_available():
+        raise ValueError("rsync is not installed locally; use ssh_upload or ssh_download instead")
+    
+    # If remote path is relative, make it relative to PROJECT_DIR like the other transfer tools
+    if not Path(remote_path).is_absolute():
+        remote_path = str(PROJECT_DIR / remote_path)
     
     # Build rsync command
     rsync_cmd = ["rsync", "-avz"]  # archive, verbose, compress
@@ -772,9 +1062,9 @@ async def ssh_sync(
             rsync_cmd.extend(["--exclude", pattern])
     
     # Add SSH options
-    ssh_options = f"-p {SSH_PORT}"
-    if SSH_KEY_FILENAME:
-        ssh_options += f" -i {SSH_KEY_FILENAME}"
+    ssh_options = f"-p {params['port']}"
+    if params['key_filename']:
+        ssh_options += f" -i {shlex.quote(os.path.expanduser(params['key_filename']))}"
     rsync_cmd.extend(["-e", f"ssh {ssh_options}"])
     
     # Build source and destination paths
@@ -783,12 +1073,12 @@ async def ssh_sync(
         if not local_path.endswith('/'):
             local_path += '/'
         source = local_path
-        destination = f"{SSH_USERNAME}@{SSH_HOST}:{remote_path}"
+        destination = f"{params['username']}@{params['host']}:{remote_path}"
     else:  # download
         # Ensure remote path ends with / for directory sync
         if not remote_path.endswith('/'):
             remote_path += '/'
-        source = f"{SSH_USERNAME}@{SSH_HOST}:{remote_path}"
+        source = f"{params['username']}@{params['host']}:{remote_path}"
         destination = local_path
     
     rsync_cmd.extend([source, destination])
@@ -832,6 +1122,8 @@ async def ssh_sync(
         
         # Wait for process to complete
         returncode = await process.wait()
+        # rsync may have changed the remote tree, even when it fails part way
+        FILE_OPS.forget_cached_stats()
         
         # Clear progress line
         if show_progress:
@@ -902,7 +1194,9 @@ async def ssh_sync(
 # Git Operations Tools
 
 @mcp.tool()
+@requires_git_ops
 async def git_status(
+    git_ops: GitOperations,
     path: Optional[str] = None
 ) -> Dict[str, Any]:
     """
@@ -914,16 +1208,13 @@ async def git_status(
     Returns:
         Dictionary with repository status information
     """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.status(work_path)
+    return await git_ops.status(path)
 
 
 @mcp.tool()
+@requires_git_ops
 async def git_init(
+    git_ops: GitOperations,
     path: Optional[str] = None
 ) -> Dict[str, Any]:
     """
@@ -935,19 +1226,17 @@ async def git_init(
     Returns:
         Dictionary with initialization result
     """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.init(work_path)
+    return await git_ops.init(path)
 
 
 @mcp.tool()
+@requires_git_ops
 async def git_clone(
+    git_ops: GitOperations,
     url: str,
     path: Optional[str] = None,
-    branch: Optional[str] = None
+    branch: Optional[str] = None,
+    depth: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Clone a remote git repository.
@@ -956,20 +1245,21 @@ async def git_clone(
         url: Repository URL to clone
         path: Local path to clone into (defaults to project directory)
         branch: Specific branch to clone
+        depth: Only fetch this many commits of the branch (shallow clone). Much
+               faster for large repositories, but older history, other branches
+               and history-dependent commands such as blame are unavailable
+               until the clone is deepened with git fetch --unshallow
         
     Returns:
         Dictionary with clone result
     """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.clone(url, work_path, branch)
+    return await git_ops.clone(url, path, branch, depth)
 
 
 @mcp.tool()
+@requires_git_ops
 async def git_add(
+    git_ops: GitOperations,
     files: Union[str, List[str]],
     path: Optional[str] = None
 ) -> Dict[str, Any]:
@@ -983,16 +1273,13 @@ async def git_add(
     Returns:
         Dictionary with add result
     """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.add(files, work_path)
+    return await git_ops.add(files, path)
 
 
 @mcp.tool()
+@requires_git_ops
 async def git_commit(
+    git_ops: GitOperations,
     message: str,
     path: Optional[str] = None
 ) -> Dict[str, Any]:
@@ -1006,16 +1293,13 @@ async def git_commit(
     Returns:
         Dictionary with commit result including commit hash
     """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.commit(message, work_path)
+    return await git_ops.commit(message, path)
 
 
 @mcp.tool()
+@requires_git_ops
 async def git_push(
+    git_ops: GitOperations,
     remote: str = "origin",
     branch: Optional[str] = None,
     set_upstream: bool = False,
@@ -1033,16 +1317,13 @@ async def git_push(
     Returns:
         Dictionary with push result
     """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.push(remote, branch, work_path, set_upstream)
+    return await git_ops.push(remote, branch, path, set_upstream)
 
 
 @mcp.tool()
+@requires_git_ops
 async def git_pull(
+    git_ops: GitOperations,
     remote: str = "origin",
     branch: Optional[str] = None,
     path: Optional[str] = None
@@ -1058,16 +1339,13 @@ async def git_pull(
     Returns:
         Dictionary with pull result
     """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.pull(remote, branch, work_path)
+    return await git_ops.pull(remote, branch, path)
 
 
 @mcp.tool()
+@requires_git_ops
 async def git_log(
+    git_ops: GitOperations,
     limit: int = 10,
     oneline: bool = True,
     path: Optional[str] = None
@@ -1083,16 +1361,37 @@ async def git_log(
     Returns:
         Dictionary with commit log
     """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
+    return await git_ops.log(limit, oneline, path)
+
+
+@mcp.tool()
+@requires_git_ops
+async def git_log_batch(
+    git_ops: GitOperations,
+    limit: int = 10,
+    include_stats: bool = True,
+    include_files: bool = True,
+    path: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Get commits together with their messages, changed files and line counts in one call.
     
-    work_path = Path(path) if path else None
-    return await git_ops.log(limit, oneline, work_path)
+    Args:
+        limit: Number of commits to show (default: 10)
+        include_stats: Include added/deleted line counts per file (default: True)
+        include_files: Include changed files with their status (default: True)
+        path: Repository path (defaults to project directory)
+        
+    Returns:
+        Dictionary with commits, each listing its changed files
+    """
+    return await git_ops.log_batch(limit, include_stats, include_files, path)
 
 
 @mcp.tool()
+@requires_git_ops
 async def git_branch(
+    git_ops: GitOperations,
     create: Optional[str] = None,
     delete: Optional[str] = None,
     list_all: bool = False,
@@ -1110,16 +1409,13 @@ async def git_branch(
     Returns:
         Dictionary with branch operation result
     """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.branch(create, delete, list_all, work_path)
+    return await git_ops.branch(create, delete, list_all, path)
 
 
 @mcp.tool()
+@requires_git_ops
 async def git_checkout(
+    git_ops: GitOperations,
     branch: str,
     create: bool = False,
     path: Optional[str] = None
@@ -1135,16 +1431,13 @@ async def git_checkout(
     Returns:
         Dictionary with checkout result
     """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.checkout(branch, create, work_path)
+    return await git_ops.checkout(branch, create, path)
 
 
 @mcp.tool()
+@requires_git_ops
 async def git_diff(
+    git_ops: GitOperations,
     cached: bool = False,
     path: Optional[str] = None
 ) -> Dict[str, Any]:
@@ -1158,16 +1451,13 @@ async def git_diff(
     Returns:
         Dictionary with diff output
     """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.diff(cached, work_path)
+    return await git_ops.diff(cached, path)
 
 
 @mcp.tool()
+@requires_git_ops
 async def git_remote(
+    git_ops: GitOperations,
     action: str = "list",
     name: Optional[str] = None,
     url: Optional[str] = None,
@@ -1185,17 +1475,9 @@ async def git_remote(
     Returns:
         Dictionary with remote operation result
     """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.remote(action, name, url, work_path)
+    return await git_ops.remote(action, name, url, path)
 
 
-# Run the server
-if __name__ == "__main__":
-    mcp.run()
 
 @mcp.tool()
 async def delete_file(
@@ -1352,30 +1634,73 @@ async def copy_file(
     return result
 
 
-async def walk_with_depth_async(path: Path, pattern: str, max_depth: Optional[int] = None) -> AsyncIterator[Path]:
-    """Walk directory tree with optional depth limit using current file operations backend"""
-    import fnmatch
+async def walk_with_depth_async(
+    path: Path,
+    pattern: str,
+    max_depth: Optional[int] = None
+) -> AsyncIterator[Tuple[Path, List[Tuple[str, bool, bool]]]]:
+    """
+    Walk directory tree with optional depth limit using current file operations backend.
+    
+    Yields one (directory, entries) pair per directory, where entries are the
+    (name, is_dir, is_file) tuples from FILE_OPS.scandir() whose names match pattern.
+    """
+    matches = _compile_name_pattern(pattern)
+    # Over SSH, subdirectories are listed ahead of the walk so their round-trips overlap;
+    # SFTP pipelines concurrent requests on the one channel
+    prefetch = CONNECTION_TYPE != "local"
+    semaphore = asyncio.Semaphore(SEARCH_CONCURRENCY)
+    
+    async def _scandir(dir_path: Path) -> Optional[List[Tuple[str, bool, bool]]]:
+        try:
+            async with semaphore:
+                return await FILE_OPS.scandir(dir_path)
+        except Exception:
+            return None  # Inaccessible; the walk skips it
     
-    async def _walk(current_path: Path, current_depth: int = 0) -> AsyncIterator[Path]:
+    async def _walk(current_path: Path, current_depth: int = 0, listing: Optional[asyncio.Task] = None):
         if max_depth is not None and current_depth > max_depth:
             return
         
         try:
-            entries = await FILE_OPS.listdir(current_path)
-            for entry_name in entries:
-                entry_path = current_path / entry_name
-                
-                if fnmatch.fnmatch(entry_name, pattern):
-                    yield entry_path
-                
-                if await FILE_OPS.is_dir(entry_path):
-                    async for subentry in _walk(entry_path, current_depth + 1):
-                        yield subentry
+            entries = await (listing if listing is not None else FILE_OPS.scandir(current_path))
         except Exception:
-            pass  # Skip inaccessible directories
-    
-    async for item in _walk(path):
-        yield item
+            return  # Skip inaccessible directories
+        if entries is None:
+            return
+        
+        yield current_path, [entry for entry in entries if matches(entry[0])]
+        
+        subdirs = [current_path / entry_name for entry_name, is_dir, _ in entries if is_dir]
+        
+        listings = [None] * len(subdirs)
+        if prefetch and subdirs and (max_depth is None or current_depth < max_depth):
+            listings = [asyncio.ensure_future(_scandir(child_path)) for child_path in subdirs]
+        try:
+            for child_path, child_listing in zip(subdirs, listings):
+                async for group in _walk(child_path, current_depth + 1, child_listing):
+                    yield group
+        finally:
+            for child_listing in listings:
+                if child_listing is not None:
+                    child_listing.cancel()  # Unfinished listings only, e.g. after a timeout
+    
+    async for group in _walk(path):
+        yield group
+
+async def _gather_bounded(func, items: List[Any], concurrency: int, chunk_size: int = 512) -> None:
+    """Await func(index, item) for every item, keeping at most `concurrency` calls in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def _run(index: int, item: Any) -> None:
+        async with semaphore:
+            await func(index, item)
+    
+    # Create tasks a chunk at a time so huge trees don't allocate one task per file up front
+    for start in range(0, len(items), chunk_size):
+        end = min(start + chunk_size, len(items))
+        await asyncio.gather(*(_run(i, items[i]) for i in range(start, end)))
+        await asyncio.sleep(0)  # Allow other tasks to run
 
 def walk_with_depth(path: Path, pattern: str, max_depth: Optional[int] = None) -> Iterator[Path]:
     """
@@ -1389,22 +1714,131 @@ def walk_with_depth(path: Path, pattern: str, max_depth: Optional[int] = None) -
     Yields:
         Matching file paths
     """
-    def _walk(current_path: Path, current_depth: int):
+    if pattern and '/' not in pattern and os.sep not in pattern:
+        match_name = _compile_name_pattern(pattern)
+        matches = lambda entry: match_name(entry.name)
+    else:
+        # Multi-part patterns match against trailing path components
+        matches = lambda entry: Path(entry.path).match(pattern)
+    
+    def _walk(current_path: Union[Path, str], current_depth: int):
         if max_depth is not None and current_depth > max_depth:
             return
             
         try:
-            for item in current_path.iterdir():
-                if item.is_file() and item.match(pattern):
-                    yield item
-                elif item.is_dir() and not item.name.startswith('.'):
-                    yield from _walk(item, current_depth + 1)
+            with os.scandir(current_path) as entries:
+                for entry in entries:
+                    if matches(entry) and entry.is_file():
+                        yield Path(entry.path)
+                    elif entry.is_dir() and not entry.name.startswith('.'):
+                        yield from _walk(entry.path, current_depth + 1)
         except (PermissionError, OSError):
             # Skip directories we can't access
             pass
     
     yield from _walk(path, 0)
 
+def _scandir_walk(root: Path) -> Iterator[Tuple[os.DirEntry, Path]]:
+    """
+    Walk a local tree top-down in os.walk order, yielding (entry, path relative to root).
+    
+    Directory entries come before their contents; symlinked directories are
+    listed but not entered, and unreadable directories are skipped.
+    """
+    stack = [(os.fspath(root), Path())]
+    while stack:
+        current, rel_path = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        
+        subdirs = []
+        for entry in entries:
+            entry_rel = rel_path / entry.name
+            yield entry, entry_rel
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append((entry.path, entry_rel))
+            except OSError:
+                pass
+        stack.extend(reversed(subdirs))
+
+# Line boundaries str.splitlines() honours besides '\n' and '\r'
+_OTHER_LINE_BREAKS_RE = re.compile('[\v\f\x1c-\x1e\x85\u2028\u2029]')
+
+# \A, \Z and lookarounds see past the end of a line when run over a whole text
+_LINE_CONTEXT_RE = re.compile(r'\\[AZz]|\(\?<?[=!]')
+
+def _count_lines(content: str) -> int:
+    """Number of lines in content, counted as len(content.splitlines()) would"""
+    if '\r' in content or _OTHER_LINE_BREAKS_RE.search(content):
+        return len(content.splitlines())
+    count = content.count('\n')
+    if content and not content.endswith('\n'):
+        count += 1
+    return count
+
+def _scan_lines(content: str, regex: Optional[re.Pattern], line_regex: re.Pattern) -> List[Dict[str, Any]]:
+    """
+    Find the lines of content that line_regex matches.
+    
+    Lines are numbered as content.splitlines() splits them. regex is the same
+    pattern compiled with re.MULTILINE, or None when it cannot be run over the
+    whole text; it locates candidate lines in one pass. Returns one match dict
+    per line.
+    """
+    matches = []
+    
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    
+    if regex is None or _OTHER_LINE_BREAKS_RE.search(content):
+        # Search line by line; the whole-text scan below only knows '\n' as a boundary
+        for line_num, line in enumerate(content.splitlines(), 1):
+            line_match = line_regex.search(line)
+            if line_match:
+                matches.append({
+                    "line_number": line_num,
+                    "line": line.rstrip(),
+                    "column": line_match.start()
+                })
+        return matches
+    
+    # Scan the whole text for candidate lines instead of searching every line;
+    # candidates arrive in order, so line numbers are counted forward from the last one
+    line_index = 0
+    counted = 0  # Newlines before this offset are included in line_index
+    pos = 0
+    while True:
+        match = regex.search(content, pos)
+        if not match:
+            break
+        line_start = content.rfind('\n', 0, match.start()) + 1
+        if line_start >= len(content):
+            break  # Past the final newline there is no further line
+        line_index += content.count('\n', counted, line_start)
+        counted = line_start
+        line_end = content.find('\n', match.start())
+        if line_end == -1:
+            line_end = len(content)
+        
+        # Confirm on the line alone, so matches spanning lines are not reported
+        line = content[line_start:line_end]
+        line_match = line_regex.search(line)
+        if line_match:
+            matches.append({
+                "line_number": line_index + 1,
+                "line": line.rstrip(),
+                "column": line_match.start()
+            })
+        if line_end >= len(content):
+            break
+        pos = line_end + 1
+    
+    return matches
+
 @mcp.tool()
 async def search_files(
     pattern: str,
@@ -1445,15 +1879,17 @@ async def search_files(
             "error": "Invalid path: directory traversal detected"
         }
         
-    regex = re.compile(pattern)
-    results = []
+    line_regex = _compile_regex(pattern)
+    # MULTILINE keeps ^ and $ anchored to lines while scanning whole files; patterns
+    # that look beyond a line are searched line by line instead
+    regex = _compile_regex(pattern, re.MULTILINE) if not _LINE_CONTEXT_RE.search(pattern) else None
+    literal = _literal_text(pattern)
+    found: Dict[int, Dict[str, Any]] = {}  # Keyed by file order, so results stay ordered
     files_searched = 0
     timeout_occurred = False
     error = None
     
     async def _search():
-        nonlocal files_searched
-        
         # Check if search_path exists
         if not await FILE_OPS.exists(search_path):
             raise ValueError(f"Path does not exist: {path}")
@@ -1465,60 +1901,59 @@ async def search_files(
         else:
             if recursive:
                 # Use async walk for file discovery
-                async for item in walk_with_depth_async(search_path, file_pattern, max_depth):
-                    if await FILE_OPS.is_file(item):
-                        files_to_search.append(item)
+                async for dir_path, entries in walk_with_depth_async(search_path, file_pattern, max_depth):
+                    for entry_name, _, is_file in entries:
+                        if is_file:
+                            files_to_search.append(dir_path / entry_name)
             else:
-                # List directory and filter
-                import fnmatch
-                entries = await FILE_OPS.listdir(search_path)
-                for entry_name in entries:
-                    if fnmatch.fnmatch(entry_name, file_pattern):
-                        entry_path = search_path / entry_name
-                        if await FILE_OPS.is_file(entry_path):
-                            files_to_search.append(entry_path)
+                # List directory and filter, using the entry types from the listing
+                matches = _compile_name_pattern(file_pattern)
+                entries = await FILE_OPS.scandir(search_path)
+                for entry_name, _, is_file in entries:
+                    if is_file and matches(entry_name):
+                        files_to_search.append(search_path / entry_name)
                 
-        for file_path in files_to_search:
-            # Check if we should yield control periodically
-            if files_searched % 100 == 0:
-                await asyncio.sleep(0)  # Allow other tasks to run
-                
-            file_type = get_file_type(file_path)
-            if file_type != "text":
-                continue
-                
-            matches = []
+        async def _search_file(index: int, file_path: Path) -> None:
+            nonlocal files_searched
+            
             try:
-                # Read file content
-                content = await FILE_OPS.read_file(file_path, encoding='utf-8')
-                
-                # Search line by line
-                for line_num, line in enumerate(content.splitlines(), 1):
-                    if regex.search(line):
-                        match = regex.search(line)
-                        matches.append({
-                            "line_number": line_num,
-                            "line": line.rstrip(),
-                            "column": match.start() if match else 0
-                        })
+                # Read the file a piece of whole lines at a time so huge files never sit in memory whole
+                matches = []
+                line_offset = 0
+                async for content in FILE_OPS.iter_line_chunks(file_path, SEARCH_CHUNK_SIZE):
+                    # Skip the regex scan when a plain-text pattern is absent from the piece
+                    if literal is None or literal in content:
+                        # Large pieces are scanned in a worker thread so other reads keep flowing
+                        if len(content) > THREAD_OFFLOAD_THRESHOLD:
+                            chunk_matches = await asyncio.to_thread(_scan_lines, content, regex, line_regex)
+                        else:
+                            chunk_matches = _scan_lines(content, regex, line_regex)
+                        for match in chunk_matches:
+                            match["line_number"] += line_offset
+                        matches.extend(chunk_matches)
+                    line_offset += _count_lines(content)
                             
                 files_searched += 1
             except Exception as e:
                 # Log the error but continue searching
-                continue
+                return
                 
             if matches:
                 file_result = {"file": str(file_path)}
                 
                 # Add relative path for local connections
                 if CONNECTION_TYPE == "local":
-                    try:
-                        file_result["file_relative"] = str(file_path.relative_to(BASE_DIR))
-                    except ValueError:
-                        pass
+                    relative = _relative_to_base(file_path)
+                    if relative is not None:
+                        file_result["file_relative"] = relative
                 
                 file_result["matches"] = matches
-                results.append(file_result)
+                found[index] = file_result
+        
+        # Read and scan several files at once so remote round-trips overlap
+        text_files = [p for p in files_to_search
+                      if p.suffix.lower() not in SEARCH_SKIP_SUFFIXES and get_file_type(p) == "text"]
+        await _gather_bounded(_search_file, text_files, SEARCH_CONCURRENCY)
     
     try:
         # Run search with timeout
@@ -1533,7 +1968,7 @@ async def search_files(
         error = str(e)
     
     return {
-        "results": results,
+        "results": [found[i] for i in sorted(found)],
         "completed": completed,
         "files_searched": files_searched,
         "timeout_occurred": timeout_occurred,
@@ -1581,15 +2016,14 @@ async def replace_in_files(
             "error": "Invalid path: directory traversal detected"
         }
         
-    regex = re.compile(search)
-    results = []
+    regex = _compile_regex(search)
+    literal = _literal_text(search)
+    found: Dict[int, Dict[str, Any]] = {}  # Keyed by file order, so results stay ordered
     files_processed = 0
     timeout_occurred = False
     error = None
     
     async def _replace():
-        nonlocal files_processed
-        
         # Check if search_path exists
         if not await FILE_OPS.exists(search_path):
             raise ValueError(f"Path does not exist: {path}")
@@ -1601,52 +2035,60 @@ async def replace_in_files(
         else:
             if recursive:
                 # Use async walk for file discovery
-                async for item in walk_with_depth_async(search_path, file_pattern, max_depth):
-                    if await FILE_OPS.is_file(item):
-                        files_to_process.append(item)
+                async for dir_path, entries in walk_with_depth_async(search_path, file_pattern, max_depth):
+                    for entry_name, _, is_file in entries:
+                        if is_file:
+                            files_to_process.append(dir_path / entry_name)
             else:
-                # List directory and filter
-                import fnmatch
-                entries = await FILE_OPS.listdir(search_path)
-                for entry_name in entries:
-                    if fnmatch.fnmatch(entry_name, file_pattern):
-                        entry_path = search_path / entry_name
-                        if await FILE_OPS.is_file(entry_path):
-                            files_to_process.append(entry_path)
-                
-        for file_path in files_to_process:
-            if files_processed % 50 == 0:
-                await asyncio.sleep(0)
-                
-            file_type = get_file_type(file_path)
-            if file_type != "text":
-                continue
+                # List directory and filter, using the entry types from the listing
+                matches = _compile_name_pattern(file_pattern)
+                entries = await FILE_OPS.scandir(search_path)
+                for entry_name, _, is_file in entries:
+                    if is_file and matches(entry_name):
+                        files_to_process.append(search_path / entry_name)
                 
+        async def _replace_file(index: int, file_path: Path) -> None:
+            nonlocal files_processed
+            
             try:
                 # Read file content
                 content = await FILE_OPS.read_file(file_path, encoding='utf-8')
                 
-                # Perform replacements
-                new_content, count = regex.subn(replace, content)
+                # A plain-text search that is absent from the file needs no regex pass
+                if literal is not None and literal not in content:
+                    files_processed += 1
+                    return
+                
+                # Perform replacements, in a worker thread for large files
+                if len(content) > THREAD_OFFLOAD_THRESHOLD:
+                    new_content, count = await asyncio.to_thread(regex.subn, replace, content)
+                else:
+                    new_content, count = regex.subn(replace, content)
                 
                 if count > 0:
-                    # Write back the modified content
-                    await FILE_OPS.write_file(file_path, new_content, encoding='utf-8')
+                    # Write back the modified content, unless backreferences reproduced it exactly;
+                    # the rename-based write never leaves a half-written file behind
+                    if new_content != content:
+                        await FILE_OPS.write_file_atomic(file_path, new_content, encoding='utf-8')
                     
                     file_result = {"file": str(file_path), "replacements": count}
                     
                     # Add relative path for local connections
                     if CONNECTION_TYPE == "local":
-                        try:
-                            file_result["file_relative"] = str(file_path.relative_to(BASE_DIR))
-                        except ValueError:
-                            pass
+                        relative = _relative_to_base(file_path)
+                        if relative is not None:
+                            file_result["file_relative"] = relative
                     
-                    results.append(file_result)
+                    found[index] = file_result
                     
                 files_processed += 1
             except Exception:
-                continue
+                return
+        
+        # Writes are heavier than reads, so fewer files are rewritten at once
+        text_files = [p for p in files_to_process
+                      if p.suffix.lower() not in SEARCH_SKIP_SUFFIXES and get_file_type(p) == "text"]
+        await _gather_bounded(_replace_file, text_files, REPLACE_CONCURRENCY)
     
     try:
         await asyncio.wait_for(_replace(), timeout=timeout)
@@ -1660,7 +2102,7 @@ async def replace_in_files(
         error = str(e)
     
     return {
-        "results": results,
+        "results": [found[i] for i in sorted(found)],
         "completed": completed,
         "files_processed": files_processed,
         "timeout_occurred": timeout_occurred,
@@ -1673,7 +2115,7 @@ class FilePatcher:
     
     @staticmethod
     def apply_line_patch(lines: List[str], patch: Dict[str, Any]) -> Tuple[List[str], Dict[str, Any]]:
-        """Apply a line-based patch"""
+        """Apply a line-based patch, editing lines in place"""
         change_info = {"type": "line", "success": False}
         
         if "line" in patch:
@@ -1716,7 +2158,7 @@ class FilePatcher:
     
     @staticmethod
     def apply_pattern_patch(content: str, patch: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
-        """Apply a pattern-based patch"""
+        """Apply a pattern-based patch to the whole text (callers rejoin lines first)"""
         change_info = {"type": "pattern", "success": False}
         
         find_pattern = patch["find"]
@@ -1725,7 +2167,7 @@ class FilePatcher:
         regex = patch.get("regex", False)
         
         if regex:
-            pattern = re.compile(find_pattern, re.MULTILINE)
+            pattern = _compile_regex(find_pattern, re.MULTILINE)
             matches = list(pattern.finditer(content))
             change_info["matches"] = len(matches)
             
@@ -1744,7 +2186,7 @@ class FilePatcher:
                         })
                 else:
                     # Replace all occurrences
-                    old_text = pattern.findall(content)[0] if pattern.findall(content) else ""
+                    old_text = matches[0].group(0)
                     content, count = pattern.subn(replace_with, content)
                     change_info.update({
                         "replaced": count,
@@ -1761,15 +2203,18 @@ class FilePatcher:
                 if occurrence is not None:
                     # Replace specific occurrence
                     if 0 < occurrence <= occurrences:
-                        parts = content.split(find_pattern, occurrence)
-                        if len(parts) > occurrence:
-                            content = find_pattern.join(parts[:occurrence]) + replace_with + parts[occurrence]
-                            change_info.update({
-                                "replaced": 1,
-                                "old": find_pattern,
-                                "new": replace_with,
-                                "success": True
-                            })
+                        # Walk to the requested occurrence instead of splitting and rejoining
+                        step = len(find_pattern) or 1
+                        start = -step
+                        for _ in range(occurrence):
+                            start = content.find(find_pattern, start + step)
+                        content = content[:start] + replace_with + content[start + len(find_pattern):]
+                        change_info.update({
+                            "replaced": 1,
+                            "old": find_pattern,
+                            "new": replace_with,
+                            "success": True
+                        })
                 else:
                     # Replace all occurrences
                     content = content.replace(find_pattern, replace_with)
@@ -1784,7 +2229,7 @@ class FilePatcher:
     
     @staticmethod
     def apply_context_patch(lines: List[str], patch: Dict[str, Any]) -> Tuple[List[str], Dict[str, Any]]:
-        """Apply a context-based patch"""
+        """Apply a context-based patch, editing lines in place"""
         change_info = {"type": "context", "success": False}
         
         context_lines = patch["context"]
@@ -1792,32 +2237,54 @@ class FilePatcher:
         
         # Normalize line endings for comparison
         context_normalized = [line.rstrip('\n') for line in context_lines]
-        lines_normalized = [line.rstrip('\n') for line in lines]
-        
-        # Find the context in the file
-        for i in range(len(lines_normalized) - len(context_normalized) + 1):
-            if lines_normalized[i:i + len(context_normalized)] == context_normalized:
-                # Found the context, apply the replacement
-                old_content = lines[i:i + len(context_normalized)]
-                
-                # Prepare replacement with proper line endings
-                new_lines = []
-                for j, new_line in enumerate(replacement_lines):
-                    if j < len(old_content) and old_content[j].endswith('\n'):
-                        new_lines.append(new_line + '\n' if not new_line.endswith('\n') else new_line)
-                    else:
-                        new_lines.append(new_line)
-                
-                lines[i:i + len(context_normalized)] = new_lines
-                
-                change_info.update({
-                    "line_start": i + 1,
-                    "line_end": i + len(context_normalized),
-                    "old": [line.rstrip('\n') for line in old_content],
-                    "new": [line.rstrip('\n') for line in new_lines],
-                    "success": True
-                })
-                break
+        context_len = len(context_normalized)
+        
+        match_line = None
+        if not context_normalized:
+            match_line = 0
+        elif context_len <= len(lines):
+            joined = '\n'.join(line.rstrip('\n') for line in lines)
+            if joined.count('\n') == len(lines) - 1:
+                # Find the context with one str.find over the joined text; a hit only
+                # counts when it starts and ends on line boundaries
+                if not any('\n' in line for line in context_normalized):
+                    needle = '\n'.join(context_normalized)
+                    pos = joined.find(needle)
+                    while pos != -1:
+                        end = pos + len(needle)
+                        if (pos == 0 or joined[pos - 1] == '\n') and (end == len(joined) or joined[end] == '\n'):
+                            match_line = joined.count('\n', 0, pos)
+                            break
+                        pos = joined.find(needle, pos + 1)
+            else:
+                # Earlier patches left embedded newlines in some lines; compare line by line
+                for i in range(len(lines) - context_len + 1):
+                    if all(lines[i + j].rstrip('\n') == context_normalized[j] for j in range(context_len)):
+                        match_line = i
+                        break
+        
+        if match_line is not None:
+            # Found the context, apply the replacement
+            i = match_line
+            old_content = lines[i:i + context_len]
+            
+            # Prepare replacement with proper line endings
+            new_lines = []
+            for j, new_line in enumerate(replacement_lines):
+                if j < len(old_content) and old_content[j].endswith('\n'):
+                    new_lines.append(new_line + '\n' if not new_line.endswith('\n') else new_line)
+                else:
+                    new_lines.append(new_line)
+            
+            lines[i:i + context_len] = new_lines
+            
+            change_info.update({
+                "line_start": i + 1,
+                "line_end": i + context_len,
+                "old": [line.rstrip('\n') for line in old_content],
+                "new": [line.rstrip('\n') for line in new_lines],
+                "success": True
+            })
         
         return lines, change_info
     
@@ -1843,6 +2310,10 @@ class FilePatcher:
         return content, change_info
 
 
+# FilePatcher holds no state, so every patch_file call shares one instance
+FILE_PATCHER = FilePatcher()
+
+
 @mcp.tool()
 async def set_project_directory(
     path: str,
@@ -1873,10 +2344,10 @@ async def set_project_directory(
         # Parse SSH URL if provided
         if path.startswith("ssh://"):
             ssh_params = SSHConnectionManager.parse_ssh_url(path)
-            ssh_host = ssh_params['host']
-            ssh_username = ssh_params.get('username') or ssh_username
-            ssh_port = ssh_params.get('port', ssh_port)
-            path = ssh_params['path']
+            ssh_host = ssh_params.host
+            ssh_username = ssh_params.username or ssh_username
+            ssh_port = ssh_params.port
+            path = ssh_params.path
         
         # Validate SSH parameters
         if not ssh_host:
@@ -1898,7 +2369,7 @@ async def set_project_directory(
             )
             
             # Create SSH file operations
-            FILE_OPS = SSHFileOperations(conn, sftp)
+            FILE_OPS = SSHFileOperations(conn, sftp, SSH_MANAGER.transfer_channels)
             CONNECTION_TYPE = "ssh"
             
             # Reset git operations to use new connection
@@ -1925,20 +2396,21 @@ async def set_project_directory(
             
         except Exception as e:
             # Reset to local on error
-            FILE_OPS = LocalFileOperations()
+            FILE_OPS = LOCAL_OPS
             CONNECTION_TYPE = "local"
+            GIT_OPS = None
             raise ValueError(f"Failed to establish SSH connection: {str(e)}")
     
     else:
         # Local connection
-        FILE_OPS = LocalFileOperations()
+        FILE_OPS = LOCAL_OPS
         CONNECTION_TYPE = "local"
         
         # Reset git operations to use new connection
         GIT_OPS = None
         
-        # Close any existing SSH connection
-        await SSH_MANAGER.close()
+        # Keep any SSH connection pooled so switching back to that host is cheap
+        SSH_MANAGER.detach()
         
         project_path = BASE_DIR / path if not Path(path).is_absolute() else Path(path)
         
@@ -2079,7 +2551,8 @@ async def patch_file(
     patches: List[Dict[str, Any]],
     backup: bool = True,
     dry_run: bool = False,
-    create_dirs: bool = False
+    create_dirs: bool = False,
+    atomic: bool = False
 ) -> Dict[str, Any]:
     """
     Apply patches to a file.
@@ -2090,6 +2563,8 @@ async def patch_file(
         backup: Create a backup before patching
         dry_run: Preview changes without applying them
         create_dirs: Create parent directories if needed
+        atomic: Replace the file atomically via a temporary file and rename,
+                so the original survives a failed write
         
     Patch formats:
         Line-based:
@@ -2117,11 +2592,29 @@ async def patch_file(
             "patches_applied": 0
         }
     
-    # Check if file exists
-    if not await FILE_OPS.exists(file_path):
+    # The type comes from the name alone, so text files are read straight away and
+    # a missing file shows up as the read's error rather than a separate check
+    file_type = get_file_type(file_path)
+    if file_type == "text":
+        try:
+            original_content = await FILE_OPS.read_file(file_path, encoding='utf-8')
+            exists = True
+        except Exception as e:
+            if not _is_missing_file_error(e):
+                return {
+                    "success": False,
+                    "error": f"Error reading file: {str(e)}",
+                    "patches_applied": 0
+                }
+            exists = False
+    else:
+        exists = await FILE_OPS.exists(file_path)
+    
+    if not exists:
         if create_dirs and patches:
             await FILE_OPS.makedirs(file_path.parent, exist_ok=True)
             await FILE_OPS.write_file(file_path, "", encoding='utf-8')
+            original_content = ""
         else:
             return {
                 "success": False,
@@ -2130,7 +2623,6 @@ async def patch_file(
             }
     
     # Check if file is text
-    file_type = get_file_type(file_path)
     if file_type != "text":
         return {
             "success": False,
@@ -2138,16 +2630,7 @@ async def patch_file(
             "patches_applied": 0
         }
     
-    # Read the file
-    try:
-        original_content = await FILE_OPS.read_file(file_path, encoding='utf-8')
-        lines = original_content.splitlines(keepends=True)
-    except Exception as e:
-        return {
-            "success": False,
-            "error": f"Error reading file: {str(e)}",
-            "patches_applied": 0
-        }
+    lines = original_content.splitlines(keepends=True)
     
     # Create backup if requested
     backup_path = None
@@ -2155,7 +2638,11 @@ async def patch_file(
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_path = file_path.parent / f"{file_path.name}.backup_{timestamp}"
         try:
-            await FILE_OPS.write_file(backup_path, original_content, encoding='utf-8')
+            if CONNECTION_TYPE == "local":
+                # Copy in the kernel rather than re-encoding the text we already read
+                await FILE_OPS.copy_file(file_path, backup_path)
+            else:
+                await FILE_OPS.write_file(backup_path, original_content, encoding='utf-8')
         except Exception as e:
             return {
                 "success": False,
@@ -2164,43 +2651,53 @@ async def patch_file(
             }
     
     # Apply patches
-    patcher = FilePatcher()
+    patcher = FILE_PATCHER
     changes = []
     patches_applied = 0
+    # Only one of lines/content is current after a patch succeeds (the other is
+    # None); the other form is rebuilt when a patch of the other kind needs it
     content = original_content
     
     for i, patch in enumerate(patches):
         try:
             if "line" in patch or "start_line" in patch:
                 # Line-based patch
+                if lines is None:
+                    lines = content.splitlines(keepends=True)
                 lines, change_info = patcher.apply_line_patch(lines, patch)
                 if change_info["success"]:
                     patches_applied += 1
-                    content = ''.join(lines)
+                    content = None
                 changes.append(change_info)
                 
             elif "find" in patch:
                 # Pattern-based patch
+                if content is None:
+                    content = ''.join(lines)
                 content, change_info = patcher.apply_pattern_patch(content, patch)
                 if change_info["success"]:
                     patches_applied += 1
-                    lines = content.splitlines(keepends=True)
+                    lines = None
                 changes.append(change_info)
                 
             elif "context" in patch:
                 # Context-based patch
+                if lines is None:
+                    lines = content.splitlines(keepends=True)
                 lines, change_info = patcher.apply_context_patch(lines, patch)
                 if change_info["success"]:
                     patches_applied += 1
-                    content = ''.join(lines)
+                    content = None
                 changes.append(change_info)
                 
             elif "unified_diff" in patch:
                 # Unified diff patch
+                if content is None:
+                    content = ''.join(lines)
                 content, change_info = patcher.apply_unified_diff_patch(content, patch["unified_diff"])
                 if change_info["success"]:
                     patches_applied += 1
-                    lines = content.splitlines(keepends=True)
+                    lines = None
                 changes.append(change_info)
                 
             else:
@@ -2217,10 +2714,16 @@ async def patch_file(
                 "error": f"Error in patch {i+1}: {str(e)}"
             })
     
+    if content is None:
+        content = ''.join(lines)
+    
     # Write the file if not dry run and at least one patch succeeded
     if not dry_run and patches_applied > 0:
         try:
-            await FILE_OPS.write_file(file_path, content, encoding='utf-8')
+            if atomic:
+                await FILE_OPS.write_file_atomic(file_path, content, encoding='utf-8')
+            else:
+                await FILE_OPS.write_file(file_path, content, encoding='utf-8')
         except Exception as e:
             return {
                 "success": False,
@@ -2262,589 +2765,6 @@ async def get_file_info(path: str) -> Dict[str, Any]:
     return await get_file_info_async(file_path)
 
 
-@mcp.tool()
-async def ssh_upload(
-    local_path: str,
-    remote_path: str,
-    recursive: bool = False,
-    overwrite: bool = True
-) -> Dict[str, Any]:
-    """
-    Upload file(s) from local filesystem to remote SSH server.
-    
-    Args:
-        local_path: Local file or directory path to upload
-        remote_path: Remote destination path (on SSH server)
-        recursive: Upload directories recursively
-        overwrite: Overwrite existing files on remote
-        
-    Returns:
-        Dictionary with upload results
-    """
-    if CONNECTION_TYPE != "ssh":
-        raise ValueError("SSH connection not established. Use set_project_directory with connection_type='ssh' first")
-    
-    # Ensure we have local file operations for reading
-    local_ops = LocalFileOperations()
-    
-    # Parse paths
-    local_path_obj = Path(local_path).resolve()
-    remote_path_obj = Path(remote_path)
-    
-    # If remote path is relative, make it relative to PROJECT_DIR
-    if not remote_path_obj.is_absolute():
-        remote_path_obj = PROJECT_DIR / remote_path_obj
-    
-    # Check if local path exists
-    if not await local_ops.exists(local_path_obj):
-        raise ValueError(f"Local path does not exist: {local_path}")
-    
-    uploaded_files = []
-    errors = []
-    
-    try:
-        if await local_ops.is_file(local_path_obj):
-            # Upload single file
-            try:
-                # Check if remote path exists and is a directory
-                remote_exists = await FILE_OPS.exists(remote_path_obj)
-                if remote_exists and await FILE_OPS.is_dir(remote_path_obj):
-                    # If remote is a directory, use same filename
-                    remote_file_path = remote_path_obj / local_path_obj.name
-                else:
-                    # Use remote path as-is
-                    remote_file_path = remote_path_obj
-                
-                # Check if should overwrite
-                if await FILE_OPS.exists(remote_file_path) and not overwrite:
-                    errors.append({
-                        "file": str(local_path_obj),
-                        "error": f"Remote file exists and overwrite=False: {remote_file_path}"
-                    })
-                else:
-                    # Read local file
-                    content = await local_ops.read(local_path_obj)
-                    
-                    # Write to remote
-                    await FILE_OPS.write(remote_file_path, content)
-                    
-                    uploaded_files.append({
-                        "local": str(local_path_obj),
-                        "remote": str(remote_file_path),
-                        "size": len(content)
-                    })
-            except Exception as e:
-                errors.append({
-                    "file": str(local_path_obj),
-                    "error": str(e)
-                })
-        
-        elif await local_ops.is_dir(local_path_obj):
-            if not recursive:
-                raise ValueError("Directory upload requires recursive=True")
-            
-            # Create remote directory if it doesn't exist
-            if not await FILE_OPS.exists(remote_path_obj):
-                await FILE_OPS.makedirs(remote_path_obj)
-            
-            # Walk through local directory
-            for root, dirs, files in os.walk(local_path_obj):
-                root_path = Path(root)
-                rel_path = root_path.relative_to(local_path_obj)
-                
-                # Create directories on remote
-                for dir_name in dirs:
-                    remote_dir = remote_path_obj / rel_path / dir_name
-                    try:
-                        if not await FILE_OPS.exists(remote_dir):
-                            await FILE_OPS.makedirs(remote_dir)
-                    except Exception as e:
-                        errors.append({
-                            "file": str(root_path / dir_name),
-                            "error": f"Failed to create remote directory: {e}"
-                        })
-                
-                # Upload files
-                for file_name in files:
-                    local_file = root_path / file_name
-                    remote_file = remote_path_obj / rel_path / file_name
-                    
-                    try:
-                        if await FILE_OPS.exists(remote_file) and not overwrite:
-                            errors.append({
-                                "file": str(local_file),
-                                "error": f"Remote file exists and overwrite=False: {remote_file}"
-                            })
-                            continue
-                        
-                        # Read local file
-                        content = await local_ops.read(local_file)
-                        
-                        # Write to remote
-                        await FILE_OPS.write(remote_file, content)
-                        
-                        uploaded_files.append({
-                            "local": str(local_file),
-                            "remote": str(remote_file),
-                            "size": len(content)
-                        })
-                    except Exception as e:
-                        errors.append({
-                            "file": str(local_file),
-                            "error": str(e)
-                        })
-    
-    except Exception as e:
-        raise ValueError(f"Upload failed: {str(e)}")
-    
-    return {
-        "uploaded": len(uploaded_files),
-        "errors": len(errors),
-        "files": uploaded_files,
-        "error_details": errors,
-        "total_size": sum(f["size"] for f in uploaded_files)
-    }
-
-
-@mcp.tool()
-async def ssh_download(
-    remote_path: str,
-    local_path: str,
-    recursive: bool = False,
-    overwrite: bool = True
-) -> Dict[str, Any]:
-    """
-    Download file(s) from remote SSH server to local filesystem.
-    
-    Args:
-        remote_path: Remote file or directory path to download (on SSH server)
-        local_path: Local destination path
-        recursive: Download directories recursively
-        overwrite: Overwrite existing local files
-        
-    Returns:
-        Dictionary with download results
-    """
-    if CONNECTION_TYPE != "ssh":
-        raise ValueError("SSH connection not established. Use set_project_directory with connection_type='ssh' first")
-    
-    # Ensure we have local file operations for writing
-    local_ops = LocalFileOperations()
-    
-    # Parse paths
-    local_path_obj = Path(local_path).resolve()
-    remote_path_obj = Path(remote_path)
-    
-    # If remote path is relative, make it relative to PROJECT_DIR
-    if not remote_path_obj.is_absolute():
-        remote_path_obj = PROJECT_DIR / remote_path_obj
-    
-    # Check if remote path exists
-    if not await FILE_OPS.exists(remote_path_obj):
-        raise ValueError(f"Remote path does not exist: {remote_path}")
-    
-    downloaded_files = []
-    errors = []
-    
-    try:
-        if await FILE_OPS.is_file(remote_path_obj):
-            # Download single file
-            try:
-                # Check if local path exists and is a directory
-                local_exists = await local_ops.exists(local_path_obj)
-                if local_exists and await local_ops.is_dir(local_path_obj):
-                    # If local is a directory, use same filename
-                    local_file_path = local_path_obj / remote_path_obj.name
-                else:
-                    # Use local path as-is
-                    local_file_path = local_path_obj
-                
-                # Check if should overwrite
-                if await local_ops.exists(local_file_path) and not overwrite:
-                    errors.append({
-                        "file": str(remote_path_obj),
-                        "error": f"Local file exists and overwrite=False: {local_file_path}"
-                    })
-                else:
-                    # Ensure parent directory exists
-                    local_file_path.parent.mkdir(parents=True, exist_ok=True)
-                    
-                    # Read remote file
-                    content = await FILE_OPS.read(remote_path_obj)
-                    
-                    # Write to local
-                    await local_ops.write(local_file_path, content)
-                    
-                    downloaded_files.append({
-                        "remote": str(remote_path_obj),
-                        "local": str(local_file_path),
-                        "size": len(content)
-                    })
-            except Exception as e:
-                errors.append({
-                    "file": str(remote_path_obj),
-                    "error": str(e)
-                })
-        
-        elif await FILE_OPS.is_dir(remote_path_obj):
-            if not recursive:
-                raise ValueError("Directory download requires recursive=True")
-            
-            # Create local directory if it doesn't exist
-            local_path_obj.mkdir(parents=True, exist_ok=True)
-            
-            # List and download directory contents recursively
-            async def download_dir(remote_dir: Path, local_dir: Path):
-                # List remote directory contents
-                entries = await FILE_OPS.listdir(remote_dir)
-                
-                for entry in entries:
-                    remote_entry = remote_dir / entry
-                    local_entry = local_dir / entry
-                    
-                    try:
-                        if await FILE_OPS.is_dir(remote_entry):
-                            # Create local directory
-                            local_entry.mkdir(exist_ok=True)
-                            # Recursively download subdirectory
-                            await download_dir(remote_entry, local_entry)
-                        else:
-                            # Download file
-                            if await local_ops.exists(local_entry) and not overwrite:
-                                errors.append({
-                                    "file": str(remote_entry),
-                                    "error": f"Local file exists and overwrite=False: {local_entry}"
-                                })
-                                continue
-                            
-                            # Read remote file
-                            content = await FILE_OPS.read(remote_entry)
-                            
-                            # Write to local
-                            await local_ops.write(local_entry, content)
-                            
-                            downloaded_files.append({
-                                "remote": str(remote_entry),
-                                "local": str(local_entry),
-                                "size": len(content)
-                            })
-                    except Exception as e:
-                        errors.append({
-                            "file": str(remote_entry),
-                            "error": str(e)
-                        })
-            
-            await download_dir(remote_path_obj, local_path_obj)
-    
-    except Exception as e:
-        raise ValueError(f"Download failed: {str(e)}")
-    
-    return {
-        "downloaded": len(downloaded_files),
-        "errors": len(errors),
-        "files": downloaded_files,
-        "error_details": errors,
-        "total_size": sum(f["size"] for f in downloaded_files)
-    }
-
-
-@mcp.tool()
-
-
-# Git Operations Tools
-
-@mcp.tool()
-async def git_status(
-    path: Optional[str] = None
-) -> Dict[str, Any]:
-    """
-    Get git repository status.
-    
-    Args:
-        path: Path to check status (defaults to project directory)
-        
-    Returns:
-        Dictionary with repository status information
-    """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.status(work_path)
-
-
-@mcp.tool()
-async def git_init(
-    path: Optional[str] = None
-) -> Dict[str, Any]:
-    """
-    Initialize a new git repository.
-    
-    Args:
-        path: Path to initialize repository (defaults to project directory)
-        
-    Returns:
-        Dictionary with initialization result
-    """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.init(work_path)
-
-
-@mcp.tool()
-async def git_clone(
-    url: str,
-    path: Optional[str] = None,
-    branch: Optional[str] = None
-) -> Dict[str, Any]:
-    """
-    Clone a remote git repository.
-    
-    Args:
-        url: Repository URL to clone
-        path: Local path to clone into (defaults to project directory)
-        branch: Specific branch to clone
-        
-    Returns:
-        Dictionary with clone result
-    """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.clone(url, work_path, branch)
-
-
-@mcp.tool()
-async def git_add(
-    files: Union[str, List[str]],
-    path: Optional[str] = None
-) -> Dict[str, Any]:
-    """
-    Add files to git staging area.
-    
-    Args:
-        files: File(s) to add (string or list of strings)
-        path: Repository path (defaults to project directory)
-        
-    Returns:
-        Dictionary with add result
-    """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.add(files, work_path)
-
-
-@mcp.tool()
-async def git_commit(
-    message: str,
-    path: Optional[str] = None
-) -> Dict[str, Any]:
-    """
-    Commit staged changes.
-    
-    Args:
-        message: Commit message
-        path: Repository path (defaults to project directory)
-        
-    Returns:
-        Dictionary with commit result including commit hash
-    """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.commit(message, work_path)
-
-
-@mcp.tool()
-async def git_push(
-    remote: str = "origin",
-    branch: Optional[str] = None,
-    set_upstream: bool = False,
-    path: Optional[str] = None
-) -> Dict[str, Any]:
-    """
-    Push commits to remote repository.
-    
-    Args:
-        remote: Remote name (default: "origin")
-        branch: Branch to push (defaults to current branch)
-        set_upstream: Set upstream tracking branch
-        path: Repository path (defaults to project directory)
-        
-    Returns:
-        Dictionary with push result
-    """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.push(remote, branch, work_path, set_upstream)
-
-
-@mcp.tool()
-async def git_pull(
-    remote: str = "origin",
-    branch: Optional[str] = None,
-    path: Optional[str] = None
-) -> Dict[str, Any]:
-    """
-    Pull changes from remote repository.
-    
-    Args:
-        remote: Remote name (default: "origin")
-        branch: Branch to pull (defaults to current branch)
-        path: Repository path (defaults to project directory)
-        
-    Returns:
-        Dictionary with pull result
-    """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.pull(remote, branch, work_path)
-
-
-@mcp.tool()
-async def git_log(
-    limit: int = 10,
-    oneline: bool = True,
-    path: Optional[str] = None
-) -> Dict[str, Any]:
-    """
-    Get git commit log.
-    
-    Args:
-        limit: Number of commits to show (default: 10)
-        oneline: Show in compact format (default: True)
-        path: Repository path (defaults to project directory)
-        
-    Returns:
-        Dictionary with commit log
-    """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.log(limit, oneline, work_path)
-
-
-@mcp.tool()
-async def git_branch(
-    create: Optional[str] = None,
-    delete: Optional[str] = None,
-    list_all: bool = False,
-    path: Optional[str] = None
-) -> Dict[str, Any]:
-    """
-    Manage git branches.
-    
-    Args:
-        create: Create a new branch with this name
-        delete: Delete branch with this name
-        list_all: List all branches including remotes
-        path: Repository path (defaults to project directory)
-        
-    Returns:
-        Dictionary with branch operation result
-    """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.branch(create, delete, list_all, work_path)
-
-
-@mcp.tool()
-async def git_checkout(
-    branch: str,
-    create: bool = False,
-    path: Optional[str] = None
-) -> Dict[str, Any]:
-    """
-    Checkout a branch or commit.
-    
-    Args:
-        branch: Branch or commit to checkout
-        create: Create new branch if it doesn't exist
-        path: Repository path (defaults to project directory)
-        
-    Returns:
-        Dictionary with checkout result
-    """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.checkout(branch, create, work_path)
-
-
-@mcp.tool()
-async def git_diff(
-    cached: bool = False,
-    path: Optional[str] = None
-) -> Dict[str, Any]:
-    """
-    Get git diff output.
-    
-    Args:
-        cached: Show staged changes instead of working directory
-        path: Repository path (defaults to project directory)
-        
-    Returns:
-        Dictionary with diff output
-    """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.diff(cached, work_path)
-
-
-@mcp.tool()
-async def git_remote(
-    action: str = "list",
-    name: Optional[str] = None,
-    url: Optional[str] = None,
-    path: Optional[str] = None
-) -> Dict[str, Any]:
-    """
-    Manage git remotes.
-    
-    Args:
-        action: Action to perform - "list", "add", "remove", "get-url"
-        name: Remote name (for add/remove/get-url)
-        url: Remote URL (for add)
-        path: Repository path (defaults to project directory)
-        
-    Returns:
-        Dictionary with remote operation result
-    """
-    git_ops = get_git_operations()
-    if not git_ops:
-        raise ValueError("No project directory set. Use set_project_directory first.")
-    
-    work_path = Path(path) if path else None
-    return await git_ops.remote(action, name, url, work_path)
-
-
 # Run the server
 if __name__ == "__main__":
     mcp.run()
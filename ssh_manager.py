@@ -2,34 +2,102 @@
 SSH connection manager for handling SSH connections and SFTP clients.
 """
 
+from __future__ import annotations
+
 import asyncio
+import functools
+import importlib.util
+import os
+import sys
+import time
 from pathlib import Path
-from typing import Optional, Dict, Any, Tuple
-import asyncssh
+from typing import Optional, Dict, Any, List, NamedTuple, Set, Tuple
 from urllib.parse import urlparse
 
 
+def lazy_import(name: str):
+    """Module that is only loaded on first attribute access (shared through sys.modules)"""
+    module = sys.modules.get(name)
+    if module is None:
+        spec = importlib.util.find_spec(name)
+        loader = importlib.util.LazyLoader(spec.loader)
+        spec.loader = loader
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        loader.exec_module(module)
+    return module
+
+
+# asyncssh pulls in cryptography, which dominates server start-up; defer it
+# until an SSH connection is actually made
+asyncssh = lazy_import('asyncssh')
+
+
+class SSHURL(NamedTuple):
+    """Parts of an ssh://[user@]host[:port]/path URL."""
+    host: str
+    port: int
+    path: str
+    username: Optional[str]
+
+
 class SSHConnectionManager:
-    """Manages SSH connections and SFTP clients."""
+    """Manages SSH connections and SFTP clients.
+    
+    Connections are pooled per (host, username, port), so switching the project
+    back to a host that was used before reuses the established session instead
+    of paying for another handshake and authentication.
+    """
+    
+    # Seconds between keepalive probes on pooled connections
+    KEEPALIVE_INTERVAL = 30
+    # SFTP channels bulk transfers are striped over per connection, kept well
+    # below OpenSSH's default MaxSessions of 10
+    TRANSFER_CHANNELS = max(1, int(os.environ.get('MCP_SFTP_CHANNELS', '4')))
+    # Pooled connections that have not been the current one for this long (seconds)
+    # are closed, by a timer or the next time a connection is requested
+    IDLE_TIMEOUT = 60.0
     
     def __init__(self):
-        self._connection: Optional[asyncssh.SSHClientConnection] = None
-        self._sftp: Optional[asyncssh.SFTPClient] = None
+        self._pool: Dict[Tuple[str, str, int], Tuple[asyncssh.SSHClientConnection, asyncssh.SFTPClient]] = {}
+        self._transfer_sftp: Dict[Tuple[str, str, int], List[asyncssh.SFTPClient]] = {}
+        self._transfer_lock = asyncio.Lock()
+        self._current: Optional[Tuple[str, str, int]] = None
+        self._idle_since: Dict[Tuple[str, str, int], float] = {}
+        self._idle_timers: Dict[Tuple[str, str, int], asyncio.TimerHandle] = {}
+        self._evictions: Set[asyncio.Task] = set()
         self._connection_params: Optional[Dict[str, Any]] = None
     
     async def connect(self, host: str, username: str, port: int = 22, 
                      key_filename: Optional[str] = None, 
                      known_hosts: Optional[str] = None) -> Tuple[asyncssh.SSHClientConnection, asyncssh.SFTPClient]:
-        """Establish SSH connection and create SFTP client."""
-        # Close existing connection if any
-        await self.close()
+        """Return a pooled SSH connection and SFTP client, dialing if needed."""
+        key = (host, username, port)
+        
+        # Store connection parameters for reconnection
+        self._connection_params = {
+            'host': host,
+            'username': username,
+            'port': port,
+            'key_filename': key_filename,
+            'known_hosts': known_hosts
+        }
+        
+        await self._evict_idle(keep=key)
+        
+        pooled = self._pool.get(key)
+        if pooled is not None and not pooled[0].is_closed():
+            self._set_current(key)
+            return pooled
+        await self._discard(key)
         
         # Prepare connection options
         connect_options = {
             'host': host,
             'username': username,
             'port': port,
-            'known_hosts': known_hosts
+            'known_hosts': known_hosts,
+            'keepalive_interval': self.KEEPALIVE_INTERVAL
         }
         
         # Add key authentication
@@ -39,67 +107,160 @@ class SSHConnectionManager:
                 raise ValueError(f"SSH key file not found: {key_filename}")
             connect_options['client_keys'] = [str(key_path)]
         
-        # Store connection parameters for reconnection
-        self._connection_params = connect_options.copy()
-        
         # Establish connection
-        self._connection = await asyncssh.connect(**connect_options)
-        self._sftp = await self._connection.start_sftp_client()
+        connection = await asyncssh.connect(**connect_options)
+        try:
+            sftp = await connection.start_sftp_client()
+        except BaseException:
+            connection.close()
+            raise
         
-        return self._connection, self._sftp
+        self._pool[key] = (connection, sftp)
+        self._set_current(key)
+        return connection, sftp
     
-    async def close(self) -> None:
-        """Close SSH connection and SFTP client."""
-        if self._sftp:
-            self._sftp.exit()
-            self._sftp = None
+    async def transfer_channels(self) -> List[asyncssh.SFTPClient]:
+        """SFTP clients of the current connection for bulk transfers, opened on first use.
+        
+        The first entry is the connection's main SFTP client. Fewer than
+        TRANSFER_CHANNELS are returned if the server refuses more sessions.
+        """
+        key = self._current
+        if key is None or key not in self._pool:
+            raise RuntimeError("No active SSH connection")
+        
+        async with self._transfer_lock:
+            channels = self._transfer_sftp.get(key)
+            if channels is None:
+                connection, sftp = self._pool[key]
+                channels = [sftp]
+                for _ in range(self.TRANSFER_CHANNELS - 1):
+                    try:
+                        channels.append(await connection.start_sftp_client())
+                    except (asyncssh.ChannelOpenError, asyncssh.SFTPError):
+                        break  # Server's MaxSessions reached
+                self._transfer_sftp[key] = channels
+            return channels
+    
+    def detach(self) -> None:
+        """Stop using the current connection but keep it pooled for later reuse."""
+        self._set_current(None)
+    
+    def _set_current(self, key: Optional[Tuple[str, str, int]]) -> None:
+        """Make key the connection in use; the previous one starts idling in the pool."""
+        if self._current is not None and self._current != key:
+            self._idle_since[self._current] = time.monotonic()
+            self._schedule_eviction(self._current)
+        self._current = key
+        if key is not None:
+            self._idle_since.pop(key, None)
+            self._cancel_eviction(key)
+    
+    def _schedule_eviction(self, key: Tuple[str, str, int]) -> None:
+        """Close key's connection after IDLE_TIMEOUT even if connect() is never called again."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No loop to run a timer on; connect() still evicts it
+        self._cancel_eviction(key)
+        self._idle_timers[key] = loop.call_later(self.IDLE_TIMEOUT, self._evict_expired, key)
+    
+    def _cancel_eviction(self, key: Tuple[str, str, int]) -> None:
+        timer = self._idle_timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+    
+    def _evict_expired(self, key: Tuple[str, str, int]) -> None:
+        """Timer callback: discard key's connection if it is still idle."""
+        self._idle_timers.pop(key, None)
+        if key == self._current or key not in self._idle_since:
+            return
+        # Keep a reference until the close finishes; a failed close leaves nothing to do
+        task = asyncio.ensure_future(self._discard(key))
+        self._evictions.add(task)
+        task.add_done_callback(lambda t: self._evictions.discard(t) or t.cancelled() or t.exception())
+    
+    async def _evict_idle(self, keep: Optional[Tuple[str, str, int]] = None) -> None:
+        """Close pooled connections that have been idle longer than IDLE_TIMEOUT."""
+        now = time.monotonic()
+        for key, since in list(self._idle_since.items()):
+            if key != keep and now - since > self.IDLE_TIMEOUT:
+                await self._discard(key)
+    
+    async def _discard(self, key: Tuple[str, str, int]) -> None:
+        """Close and forget one pooled connection."""
+        self._idle_since.pop(key, None)
+        self._cancel_eviction(key)
+        pooled = self._pool.pop(key, None)
+        if pooled is None:
+            return
         
-        if self._connection:
-            self._connection.close()
-            await self._connection.wait_closed()
-            self._connection = None
+        connection, sftp = pooled
+        for channel in self._transfer_sftp.pop(key, [])[1:]:
+            channel.exit()
+        sftp.exit()
+        connection.close()
+        await connection.wait_closed()
+    
+    async def close(self) -> None:
+        """Close all pooled SSH connections and SFTP clients."""
+        self._current = None
+        for key in list(self._pool):
+            await self._discard(key)
     
     async def reconnect(self) -> Tuple[asyncssh.SSHClientConnection, asyncssh.SFTPClient]:
         """Reconnect using stored parameters."""
         if not self._connection_params:
             raise RuntimeError("No connection parameters stored for reconnection")
         
-        return await self.connect(**self._connection_params)
+        params = self._connection_params
+        await self._discard((params['host'], params['username'], params['port']))
+        return await self.connect(**params)
     
     def is_connected(self) -> bool:
         """Check if connection is active."""
-        return self._connection is not None and not self._connection.is_closing()
+        connection = self.connection
+        return connection is not None and not connection.is_closed()
     
     @property
     def connection(self) -> Optional[asyncssh.SSHClientConnection]:
         """Get current SSH connection."""
-        return self._connection
+        pooled = self._pool.get(self._current) if self._current else None
+        return pooled[0] if pooled else None
+    
+    @property
+    def connection_params(self) -> Optional[Dict[str, Any]]:
+        """Parameters the current connection was made with, as passed to connect()."""
+        return dict(self._connection_params) if self._current and self._connection_params else None
     
     @property
     def sftp(self) -> Optional[asyncssh.SFTPClient]:
         """Get current SFTP client."""
-        return self._sftp
+        pooled = self._pool.get(self._current) if self._current else None
+        return pooled[1] if pooled else None
     
     @staticmethod
-    def parse_ssh_url(url: str) -> Dict[str, Any]:
+    @functools.lru_cache(maxsize=256)
+    def parse_ssh_url(url: str) -> SSHURL:
         """Parse SSH URL format: ssh://[user@]host[:port]/path
         
-        Returns dict with: host, username, port, path
+        Returns an SSHURL (host, port, path, username); memoized, as clients
+        pass the same URL again and again
         """
         if not url.startswith('ssh://'):
             raise ValueError("SSH URL must start with 'ssh://'")
         
         parsed = urlparse(url)
         
-        result = {
-            'host': parsed.hostname or 'localhost',
-            'port': parsed.port or 22,
-            'path': parsed.path or '/',
-            'username': parsed.username or None
-        }
+        path = parsed.path or '/'
         
         # Clean up path
-        if result['path'].startswith('/'):
-            result['path'] = result['path'][1:]  # Remove leading slash for relative paths
+        if path.startswith('/'):
+            path = path[1:]  # Remove leading slash for relative paths
         
-        return result
+        return SSHURL(
+            host=parsed.hostname or 'localhost',
+            port=parsed.port or 22,
+            path=path,
+            username=parsed.username or None
+        )
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test the git_log_batch functionality
+"""
+import asyncio
+import sys
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def git(repo, *args):
+    """Run a git command in repo with a fixed identity"""
+    subprocess.run(
+        ['git', '-c', 'user.name=Test User', '-c', 'user.email=test@example.com', *args],
+        cwd=repo, check=True, capture_output=True
+    )
+
+def make_repo(repo, name):
+    """Create a repository with an add, a modification and a rename"""
+    os.makedirs(repo)
+    git(repo, 'init', '-q')
+    Path(repo, 'a.txt').write_text("one\ntwo\n")
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-q', '-m', f'{name}: add a.txt')
+    Path(repo, 'a.txt').write_text("one\n2\nthree\n")
+    Path(repo, 'b.txt').write_text("b\n" * 20)
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-q', '-m', f'{name}: edit a.txt', '-m', 'Also adds b.txt')
+    git(repo, 'mv', 'b.txt', 'c.txt')
+    git(repo, 'commit', '-q', '-m', f'{name}: rename b.txt')
+
+async def run_git_log_batch_test():
+    import server
+    from server import set_project_directory, git_log_batch
+    
+    # git_log_batch needs a project directory, which has to live under BASE_DIR
+    with tempfile.TemporaryDirectory() as temp_dir:
+        project_repo = os.path.join(temp_dir, 'project')
+        other_repo = os.path.join(temp_dir, 'other')
+        not_a_repo = os.path.join(temp_dir, 'plain')
+        make_repo(project_repo, 'project')
+        make_repo(other_repo, 'other')
+        os.makedirs(not_a_repo)
+        
+        saved = server.BASE_DIR, server.PROJECT_DIR, server.GIT_OPS
+        server.BASE_DIR = Path(temp_dir)
+        try:
+            await set_project_directory('project')
+            await run_log_batch_tests(git_log_batch, other_repo, not_a_repo)
+        finally:
+            server.BASE_DIR, server.PROJECT_DIR, server.GIT_OPS = saved
+
+async def run_log_batch_tests(git_log_batch, other_repo, not_a_repo):
+    # Test 1: Project repository, with files and stats
+    print("1. Testing project repository:")
+    result = await git_log_batch(limit=10)
+    assert result['success'], result['stderr']
+    messages = [commit['message'] for commit in result['commits']]
+    print(f"   Commits: {messages}")
+    assert messages == ['project: rename b.txt', 'project: edit a.txt', 'project: add a.txt']
+    
+    rename, edit, add = result['commits']
+    assert len(rename['hash']) == 40 and rename['author'] == 'Test User'
+    assert rename['email'] == 'test@example.com'
+    print(f"   Rename: {rename['files']}")
+    assert rename['files'] == [
+        {"path": "c.txt", "status": "R", "old_path": "b.txt", "additions": 0, "deletions": 0}
+    ]
+    print(f"   Edit: {edit['files']}")
+    assert edit['body'] == 'Also adds b.txt'
+    assert sorted(edit['files'], key=lambda f: f['path']) == [
+        {"path": "a.txt", "status": "M", "additions": 2, "deletions": 1},
+        {"path": "b.txt", "status": "A", "additions": 20, "deletions": 0}
+    ]
+    assert add['files'] == [{"path": "a.txt", "status": "A", "additions": 2, "deletions": 0}]
+    print()
+    
+    # Test 2: Limit and optional sections
+    print("2. Testing limit without files or stats:")
+    result = await git_log_batch(limit=1, include_stats=False, include_files=False)
+    print(f"   Commits: {result['commits']}")
+    assert result['success'] and len(result['commits']) == 1
+    assert 'files' not in result['commits'][0]
+    
+    result = await git_log_batch(limit=1, include_stats=False)
+    print(f"   Files without stats: {result['commits'][0]['files']}")
+    assert result['commits'][0]['files'] == [{"path": "c.txt", "status": "R", "old_path": "b.txt"}]
+    print()
+    
+    # Test 3: Another repository through the path argument
+    print("3. Testing another repository via path:")
+    result = await git_log_batch(limit=10, path=other_repo)
+    messages = [commit['message'] for commit in result['commits']]
+    print(f"   Commits: {messages}")
+    assert result['success']
+    assert messages == ['other: rename b.txt', 'other: edit a.txt', 'other: add a.txt']
+    print()
+    
+    # Test 4: A directory that is not a repository reports the error
+    print("4. Testing a directory that is not a repository:")
+    result = await git_log_batch(path=not_a_repo)
+    print(f"   Success: {result['success']}")
+    print(f"   Return code: {result['returncode']}")
+    assert not result['success'] and result['returncode'] != 0
+    assert result['commits'] == [] and result['stderr']
+
+def test_git_log_batch():
+    """Test git_log_batch against real repositories"""
+    # Synchronous entry point, so plain pytest runs it without an asyncio plugin
+    asyncio.run(run_git_log_batch_test())
+
+if __name__ == "__main__":
+    test_git_log_batch()
+
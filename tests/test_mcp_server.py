@@ -3,153 +3,149 @@
 Test script for MCP File Editor Server
 """
 
+import asyncio
 import json
-import subprocess
 import sys
 import os
-from pathlib import Path
+import tempfile
 
-def send_request(proc, request):
+# The server under test; it works on files relative to its working directory
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'server.py')
+
+# Each response arrives as one JSON line; asyncio's default 64 KiB line limit
+# would reject larger ones such as the content of a big read_file
+STREAM_LIMIT = 16 * 1024 * 1024
+
+# Only method, params and id vary between requests; the envelope is fixed
+REQUEST_TEMPLATE = '{{"jsonrpc": "2.0", "method": {method}, "params": {params}, "id": {id}}}\n'
+NOTIFICATION_TEMPLATE = '{{"jsonrpc": "2.0", "method": {method}}}\n'
+
+INITIALIZE_PARAMS = {
+    "protocolVersion": "2025-06-18",
+    "capabilities": {},
+    "clientInfo": {"name": "test_mcp_server", "version": "1.0"}
+}
+
+async def send_request(proc, method, params, request_id):
     """Send a JSON-RPC request and get response"""
-    json_str = json.dumps(request) + '\n'
-    proc.stdin.write(json_str.encode())
-    proc.stdin.flush()
+    request = REQUEST_TEMPLATE.format(method=json.dumps(method), params=json.dumps(params), id=request_id)
+    proc.stdin.write(request.encode())
+    await proc.stdin.drain()
     
-    # Read response
-    response_line = proc.stdout.readline().decode().strip()
-    if response_line:
-        return json.loads(response_line)
-    return None
+    # Read response; json.loads takes the raw bytes and ignores the newline.
+    # Anything that is not JSON (such as a startup banner) is skipped.
+    while True:
+        response_line = await proc.stdout.readline()
+        if not response_line:
+            return None
+        try:
+            return json.loads(response_line)
+        except ValueError:
+            continue
 
-def test_server():
-    """Test the MCP server functionality"""
-    # Start the server
-    proc = subprocess.Popen(
-        [sys.executable, 'mcp_file_server.py'],
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=False
-    )
-    
+async def send_notification(proc, method):
+    """Send a JSON-RPC notification, which gets no response"""
+    proc.stdin.write(NOTIFICATION_TEMPLATE.format(method=json.dumps(method)).encode())
+    await proc.stdin.drain()
+
+async def call_tool(proc, name, arguments, request_id):
+    """Call a tool and return its structured result, failing on any error"""
+    response = await send_request(proc, "tools/call", {"name": name, "arguments": arguments}, request_id)
+    assert response is not None, "server closed the connection"
+    assert "error" not in response, response["error"]
+    result = response["result"]
+    assert not result.get("isError"), result["content"]
+    return result["structuredContent"]["result"]
+
+async def run_server_test():
+    """Drive the server through each tool over asyncio pipes"""
+    # Start the server in a throwaway directory, which becomes its base directory
+    with tempfile.TemporaryDirectory() as temp_dir:
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, SERVER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=temp_dir,
+            limit=STREAM_LIMIT
+        )
+        try:
+            await run_tool_tests(proc)
+        finally:
+            # Clean up
+            if proc.returncode is None:
+                try:
+                    proc.terminate()
+                except ProcessLookupError:
+                    pass  # Already exited
+            await proc.wait()
+
+async def run_tool_tests(proc):
     print("Testing MCP File Editor Server...\n")
     
-    try:
-        # Skip server info message
-        proc.stdout.readline()
-        
-        # Test 1: Initialize
-        print("1. Testing initialize...")
-        response = send_request(proc, {
-            "jsonrpc": "2.0",
-            "method": "initialize",
-            "params": {},
-            "id": 1
-        })
-        print(f"Response: {json.dumps(response, indent=2)}\n")
-        
-        # Test 2: List tools
-        print("2. Testing tools/list...")
-        response = send_request(proc, {
-            "jsonrpc": "2.0",
-            "method": "tools/list",
-            "params": {},
-            "id": 2
-        })
-        print(f"Available tools: {len(response['result']['tools'])}\n")
-        
-        # Test 3: Create a test file
-        print("3. Testing create_file...")
-        response = send_request(proc, {
-            "jsonrpc": "2.0",
-            "method": "tools/call",
-            "params": {
-                "name": "create_file",
-                "arguments": {
-                    "path": "test_file.txt",
-                    "content": "Hello from MCP File Editor!\nThis is a test file."
-                }
-            },
-            "id": 3
-        })
-        print(f"Created file: {response['result']['name']}\n")
-        
-        # Test 4: Read the file
-        print("4. Testing read_file...")
-        response = send_request(proc, {
-            "jsonrpc": "2.0",
-            "method": "tools/call",
-            "params": {
-                "name": "read_file",
-                "arguments": {
-                    "path": "test_file.txt"
-                }
-            },
-            "id": 4
-        })
-        print(f"File content:\n{response['result']['content']}\n")
-        
-        # Test 5: List files
-        print("5. Testing list_files...")
-        response = send_request(proc, {
-            "jsonrpc": "2.0",
-            "method": "tools/call",
-            "params": {
-                "name": "list_files",
-                "arguments": {
-                    "path": ".",
-                    "pattern": "*.txt"
-                }
-            },
-            "id": 5
-        })
-        print(f"Found {len(response['result'])} .txt files\n")
-        
-        # Test 6: Search in files
-        print("6. Testing search_files...")
-        response = send_request(proc, {
-            "jsonrpc": "2.0",
-            "method": "tools/call",
-            "params": {
-                "name": "search_files",
-                "arguments": {
-                    "pattern": "Hello",
-                    "file_pattern": "*.txt"
-                }
-            },
-            "id": 6
-        })
-        print(f"Search results: {json.dumps(response['result'], indent=2)}\n")
-        
-        # Test 7: Delete the test file
-        print("7. Testing delete_file...")
-        response = send_request(proc, {
-            "jsonrpc": "2.0",
-            "method": "tools/call",
-            "params": {
-                "name": "delete_file",
-                "arguments": {
-                    "path": "test_file.txt"
-                }
-            },
-            "id": 7
-        })
-        print(f"Deleted: {response['result']['deleted']}\n")
-        
-        print("All tests completed successfully!")
-        
-    except Exception as e:
-        print(f"Error during testing: {e}")
-        
-    finally:
-        # Clean up
-        proc.terminate()
-        proc.wait()
-        
-        # Remove test file if it still exists
-        test_file = Path("test_file.txt")
-        if test_file.exists():
-            test_file.unlink()
+    # Test 1: Initialize
+    print("1. Testing initialize...")
+    response = await send_request(proc, "initialize", INITIALIZE_PARAMS, 1)
+    print(f"Response: {json.dumps(response, indent=2)}\n")
+    assert response["result"]["serverInfo"]["name"] == "file-editor"
+    await send_notification(proc, "notifications/initialized")
+    
+    # Test 2: List tools
+    print("2. Testing tools/list...")
+    response = await send_request(proc, "tools/list", {}, 2)
+    tool_names = {tool["name"] for tool in response["result"]["tools"]}
+    print(f"Available tools: {len(tool_names)}\n")
+    assert {"create_file", "read_file", "list_files", "search_files", "delete_file"} <= tool_names
+    
+    # Test 3: Create a test file
+    print("3. Testing create_file...")
+    result = await call_tool(proc, "create_file", {
+        "path": "test_file.txt",
+        "content": "Hello from MCP File Editor!\nThis is a test file."
+    }, 3)
+    print(f"Created file: {result['name']}\n")
+    assert result["name"] == "test_file.txt"
+    
+    # Test 4: Read the file
+    print("4. Testing read_file...")
+    result = await call_tool(proc, "read_file", {
+        "path": "test_file.txt"
+    }, 4)
+    print(f"File content:\n{result['content']}\n")
+    assert result["content"] == "Hello from MCP File Editor!\nThis is a test file."
+    
+    # Test 5: List files
+    print("5. Testing list_files...")
+    result = await call_tool(proc, "list_files", {
+        "path": ".",
+        "pattern": "*.txt"
+    }, 5)
+    print(f"Found {len(result)} .txt files\n")
+    assert [info["name"] for info in result] == ["test_file.txt"]
+    
+    # Test 6: Search in files
+    print("6. Testing search_files...")
+    result = await call_tool(proc, "search_files", {
+        "pattern": "Hello",
+        "file_pattern": "*.txt"
+    }, 6)
+    print(f"Search results: {json.dumps(result, indent=2)}\n")
+    assert [match["line_number"] for match in result["results"][0]["matches"]] == [1]
+    
+    # Test 7: Delete the test file
+    print("7. Testing delete_file...")
+    result = await call_tool(proc, "delete_file", {
+        "path": "test_file.txt"
+    }, 7)
+    print(f"Deleted: {result['deleted']}\n")
+    assert result["deleted"].endswith("test_file.txt")
+    
+    print("All tests completed successfully!")
+
+def test_server():
+    """Test the MCP server functionality"""
+    # Synchronous entry point, so plain pytest runs it without an asyncio plugin
+    asyncio.run(run_server_test())
 
 if __name__ == "__main__":
     test_server()
@@ -5,12 +5,33 @@ Test the patch_file functionality
 import asyncio
 import sys
 import os
+import tempfile
+from pathlib import Path
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-async def test_patch():
+def read_fixture(path):
+    """Read a fixture file with a single read on a raw file descriptor"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, os.fstat(fd).st_size).decode()
+    finally:
+        os.close(fd)
+
+async def run_patch_file_test():
+    import server
     from server import patch_file
     
+    # The fixture and its backups live in a throwaway directory, in memory when
+    # /dev/shm is available; patch_file only accepts paths under BASE_DIR
+    with tempfile.TemporaryDirectory(dir='/dev/shm' if os.path.isdir('/dev/shm') else None) as temp_dir:
+        base_dir, server.BASE_DIR = server.BASE_DIR, Path(temp_dir)
+        try:
+            await run_patch_tests(patch_file, os.path.join(temp_dir, 'test_patch_file.py'))
+        finally:
+            server.BASE_DIR = base_dir
+
+async def run_patch_tests(patch_file, fixture):
     # Create a test file
     test_content = """line 1
 line 2
@@ -21,15 +42,18 @@ line 6
 line 7
 """
     
-    with open('test_patch_file.py', 'w') as f:
-        f.write(test_content)
+    fd = os.open(fixture, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, test_content.encode())
+    finally:
+        os.close(fd)
     
     print("=== Testing Patch Functionality ===\n")
     
     # Test 1: Line-based patch
     print("1. Testing line-based patch (single line):")
     result = await patch_file(
-        path="test_patch_file.py",
+        path=fixture,
         patches=[
             {"line": 2, "content": "# This line was patched"}
         ],
@@ -43,7 +67,7 @@ line 7
     # Test 2: Multi-line patch
     print("2. Testing multi-line patch:")
     result = await patch_file(
-        path="test_patch_file.py",
+        path=fixture,
         patches=[
             {
                 "start_line": 3,
@@ -59,7 +83,7 @@ line 7
     # Test 3: Pattern-based patch
     print("3. Testing pattern-based patch:")
     result = await patch_file(
-        path="test_patch_file.py",
+        path=fixture,
         patches=[
             {
                 "find": "line 5",
@@ -74,7 +98,7 @@ line 7
     # Test 4: Context-based patch
     print("4. Testing context-based patch:")
     result = await patch_file(
-        path="test_patch_file.py",
+        path=fixture,
         patches=[
             {
                 "context": ["# Line 5 was replaced", "line 6", "line 7"],
@@ -89,7 +113,7 @@ line 7
     # Test 5: Multiple patches in one call
     print("5. Testing multiple patches:")
     result = await patch_file(
-        path="test_patch_file.py",
+        path=fixture,
         patches=[
             {"line": 1, "content": "# First line changed"},
             {"find": "return True", "replace": "return False"},
@@ -100,14 +124,17 @@ line 7
     print(f"   Patches applied: {result['patches_applied']}/{result['patches_total']}")
     print()
     
-    # Test 6: Dry run
+    # Test 6: Dry run (leaves the file alone, so the final content is read alongside it)
     print("6. Testing dry run:")
-    result = await patch_file(
-        path="test_patch_file.py",
-        patches=[
-            {"line": 1, "content": "# This won't be applied"}
-        ],
-        dry_run=True
+    result, final_content = await asyncio.gather(
+        patch_file(
+            path=fixture,
+            patches=[
+                {"line": 1, "content": "# This won't be applied"}
+            ],
+            dry_run=True
+        ),
+        asyncio.to_thread(read_fixture, fixture)
     )
     print(f"   Dry run: {result['dry_run']}")
     print(f"   Would apply: {result['patches_applied']} patches")
@@ -115,15 +142,12 @@ line 7
     
     # Show final file content
     print("Final file content:")
-    with open('test_patch_file.py', 'r') as f:
-        print(f.read())
-    
-    # Cleanup
-    os.remove('test_patch_file.py')
-    # Remove backup files
-    for f in os.listdir('.'):
-        if f.startswith('test_patch_file.py.backup_'):
-            os.remove(f)
+    print(final_content)
+
+def test_patch():
+    """Test patch_file on a throwaway fixture"""
+    # Synchronous entry point, so plain pytest runs it without an asyncio plugin
+    asyncio.run(run_patch_file_test())
 
 if __name__ == "__main__":
-    asyncio.run(test_patch())
+    test_patch()